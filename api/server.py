@@ -0,0 +1,198 @@
+"""Read-only HTTP API over the dashboard aggregates
+
+Run with ``python -m api.server [--port 8502]``. Every endpoint answers a table
+computed by the same engine functions (and shared cache) as the dashboards:
+
+    /api/current-expenses/totals       yearly total of the selected units
+    /api/current-expenses/units        totals per unit (Jednostka)
+    /api/current-expenses/tasks        totals per task of ``unit``
+    /api/current-expenses/changes      year over year changes per unit
+    /api/districts/totals              yearly total of the selected details
+    /api/districts/types               totals per type (Rodzaj)
+    /api/districts/details             totals per detail of ``rodzaj``
+    /api/districts/changes             year over year changes per type
+    /api/incomes-expenses/totals       incomes against expenses by part
+    /api/incomes-expenses/<table>      dochody or wydatki table
+    /api/incomes-expenses/changes      year over year changes of the parts totals
+    /api/summary/<name>                dochody, przychody, wydatki or rozchody
+    /api/search                        tasks, units and items matching ``q``
+
+Filters are repeatable query arguments: ``year`` (YYYY for every dataset,
+400 for a year the dataset does not have), ``unit``, ``type``, ``detail`` and
+``name``. Responses are JSON records, or an Arrow IPC stream
+with ``?format=arrow`` or ``Accept: application/vnd.apache.arrow.stream``.
+They carry an ETag of their content, conditional GETs with a matching
+``If-None-Match`` get an empty 304 answer.
+"""
+
+import argparse
+import asyncio
+import hashlib
+from typing import Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import tornado.web
+
+from engine import current_expenses, districts, incomes_expenses, search, summary
+from loader import budget, watch
+
+ARROW_STREAM: str = "application/vnd.apache.arrow.stream"
+CHUNK_ROWS: int = 10_000
+
+Query = dict[str, tuple[str, ...]]
+Endpoint = Callable[..., pd.DataFrame]
+
+
+def _years_frame(totals: dict[str, float]) -> pd.DataFrame:
+    return pd.DataFrame({"Rok": list(totals), "Kwota": list(totals.values())})
+
+
+def _years(query: Query, labels: list[str]) -> tuple[str, ...]:
+    """Dataset labels (01_01_YYYY, 01.01.YYYY or YYYY) of the requested YYYY years"""
+    by_year = {label[-4:]: label for label in labels}
+    unknown = [year for year in query["year"] if year not in by_year]
+    if unknown:
+        raise tornado.web.HTTPError(
+            400, f"unknown year {', '.join(unknown)}, expected one of {', '.join(by_year)}"
+        )
+    return tuple(by_year[year] for year in query["year"])
+
+
+def _current_expenses(query: Query) -> current_expenses.CurrentExpensesFilter:
+    return current_expenses.CurrentExpensesFilter(
+        years=_years(query, current_expenses.years()), units=query["unit"]
+    )
+
+
+def _districts(query: Query) -> districts.DistrictsFilter:
+    return districts.DistrictsFilter(
+        years=_years(query, districts.years()), types=query["type"], details=query["detail"]
+    )
+
+
+def _incomes_expenses(query: Query) -> incomes_expenses.IncomesExpensesFilter:
+    return incomes_expenses.IncomesExpensesFilter(
+        years=_years(query, incomes_expenses.years()), names=query["name"]
+    )
+
+
+def _parts_totals(query: Query) -> pd.DataFrame:
+    spec = _incomes_expenses(query)
+    return pd.DataFrame(
+        {
+            "Rok": incomes_expenses.selected_years(spec),
+            **{
+                f"{table} {part}": incomes_expenses.totals(spec, table, part)
+                for part in incomes_expenses.TITLES
+                for table in ("dochody", "wydatki")
+            },
+        }
+    )
+
+
+def _required(query: Query, name: str) -> str:
+    if len(query[name]) != 1:
+        raise tornado.web.HTTPError(400, f"exactly one '{name}' argument is required")
+    return query[name][0]
+
+
+ENDPOINTS: dict[str, Endpoint] = {
+    "current-expenses/totals": lambda query: _years_frame(
+        current_expenses.totals(_current_expenses(query))
+    ),
+    "current-expenses/units": lambda query: current_expenses.unit_totals(
+        _current_expenses(query)
+    ),
+    "current-expenses/tasks": lambda query: current_expenses.unit_tasks(
+        _current_expenses(query), _required(query, "unit")
+    ),
+    "current-expenses/changes": lambda query: current_expenses.unit_changes(
+        _current_expenses(query)
+    ),
+    "districts/totals": lambda query: _years_frame(districts.totals(_districts(query))),
+    "districts/types": lambda query: districts.type_totals(_districts(query)),
+    "districts/details": lambda query: districts.type_details(
+        _districts(query), _required(query, "rodzaj")
+    ),
+    "districts/changes": lambda query: districts.type_changes(_districts(query)),
+    "incomes-expenses/totals": _parts_totals,
+    "incomes-expenses/changes": lambda query: incomes_expenses.changes(_incomes_expenses(query)),
+    "incomes-expenses/dochody": lambda query: incomes_expenses.tables(_incomes_expenses(query))[0],
+    "incomes-expenses/wydatki": lambda query: incomes_expenses.tables(_incomes_expenses(query))[1],
+    **{
+        f"summary/{name}": lambda query, name=name: summary.tables(
+            summary.SummaryFilter(years=_years(query, summary.years()))
+        )[name]
+        for name in budget.SUMMARY_NAMES
+    },
+    "search": lambda query: search.frame(_required(query, "q")),
+}
+FILTERS: tuple[str, ...] = ("year", "unit", "type", "detail", "name", "rodzaj", "q")
+
+
+def to_arrow(df: pd.DataFrame) -> bytes:
+    """Arrow IPC stream of frame in record batches of `CHUNK_ROWS` rows"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=CHUNK_ROWS):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def to_json(df: pd.DataFrame) -> bytes:
+    return df.to_json(orient="records", force_ascii=False).encode()
+
+
+class TableHandler(tornado.web.RequestHandler):
+    def _wants_arrow(self) -> bool:
+        if fmt := self.get_query_argument("format", None):
+            if fmt not in ("json", "arrow"):
+                raise tornado.web.HTTPError(400, "format must be json or arrow")
+            return fmt == "arrow"
+        return ARROW_STREAM in self.request.headers.get("Accept", "")
+
+    def compute_etag(self) -> Optional[str]:
+        return None  # set from the whole body before it is streamed
+
+    async def get(self, endpoint: str) -> None:
+        if endpoint not in ENDPOINTS:
+            raise tornado.web.HTTPError(404)
+        query = {name: tuple(self.get_query_arguments(name)) for name in FILTERS}
+        arrow = self._wants_arrow()
+        # pandas work runs in the default thread pool, the loop keeps serving
+        body = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: (to_arrow if arrow else to_json)(ENDPOINTS[endpoint](query))
+        )
+        self.set_header("Content-Type", ARROW_STREAM if arrow else "application/json")
+        self.set_header("Vary", "Accept")
+        self.set_header("Etag", f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        for start in range(0, len(body), 2**16):
+            self.write(body[start:start + 2**16])
+            await self.flush()
+
+
+def make_app() -> tornado.web.Application:
+    return tornado.web.Application([(r"/api/(.+)", TableHandler)])
+
+
+async def serve(port: int) -> None:
+    watch.start()
+    make_app().listen(port)
+    print(f"Budget API listening on http://localhost:{port}/api/")
+    await asyncio.Event().wait()
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8502)
+    options = parser.parse_args(args)
+    asyncio.run(serve(options.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Microbenchmark of charts.model series converters
+
+Run with ``python -m benchmarks.bench_model [--rows 10000]``.
+"""
+
+import argparse
+import timeit
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from charts.model import df_to_series
+
+
+def df_to_series_iterrows(df: pd.DataFrame) -> list[dict]:
+    """Previous row by row implementation kept as the baseline"""
+    series = []
+    label_col = df.columns[0]
+    other_cols = df.columns[1:]
+    for _, row in df.iterrows():
+        series.append(
+            {
+                "name": str(row[label_col]),
+                "data": [row[col] for col in other_cols],
+            }
+        )
+
+    return series
+
+
+def make_wide(rows: int, years: int = 4, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        rng.uniform(0, 1e7, size=(rows, years)),
+        columns=[f"01_01_{2021 + year}" for year in range(years)],
+    )
+    df.insert(0, "Nazwa zadania", [f"Zadanie {idx}" for idx in range(rows)])
+    return df
+
+
+def run(rows: int = 10_000, number: int = 5) -> dict[str, float]:
+    """Best time of `number` runs in seconds for each converter"""
+    wide = make_wide(rows)
+    cases = {
+        "iterrows": lambda: df_to_series_iterrows(wide),
+        "df_to_series": lambda: df_to_series(wide),
+    }
+    return {
+        name: min(timeit.repeat(case, number=1, repeat=number))
+        for name, case in cases.items()
+    }
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="rows of the table")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every converter")
+    options = parser.parse_args(args)
+    results = run(options.rows, options.repeat)
+    for name, seconds in results.items():
+        speedup = results["iterrows"] / seconds
+        print(f"{name:>16}: {seconds * 1000:9.2f} ms  x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Benchmark of every dashboard engine pipeline: load → filter → aggregate → options
+
+Run with ``python -m benchmarks.bench_pages [--scales 1x1 10x1 1x10 ...]``.
+A scale ``RxY`` multiplies the rows of every detail table by R and the number
+of years by Y, scaled copies of ``data/budget`` are written to a temporary
+catalog.
+Each scale is measured in a fresh process pointed at its data tree with
+``KRK_BUDGET_DATA``: the first (cold) run fills the caches, the warm runs
+repeat it the way Streamlit reruns a page. Results are written as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+
+from charts import bar, line
+from engine import cache, current_expenses, districts, incomes_expenses, summary
+from loader import budget, cube
+
+Pipeline = Callable[[], Iterator[str]]
+
+RESULTS_PATH: Path = Path(__file__).resolve().parent / "results"
+DEFAULT_SCALES: tuple[str, ...] = ("1x1", "10x1", "100x1", "1x10", "1x100")
+
+
+def main_page() -> Iterator[str]:
+    budget.load_summary()
+    yield "load"
+    spec = summary.SummaryFilter(years=tuple(summary.years()))
+    yield "filter"
+    charts = [
+        summary.totals_chart(spec),
+        summary.deficit_chart(spec),
+        summary.outgoings_chart(spec),
+        summary.expenses_chart(spec),
+        summary.revenues_chart(spec),
+    ]
+    summary.tables(spec)
+    yield "aggregate"
+    for chart in charts:
+        line.get_totals_chart_expe_inco_opt(**chart._asdict())
+    yield "options"
+
+
+def current_expenses_page() -> Iterator[str]:
+    budget.load_current_expenses()
+    cube.cuboids(current_expenses.DATASET)
+    yield "load"
+    spec = current_expenses.CurrentExpensesFilter()
+    units = current_expenses.units(spec)
+    yield "filter"
+    totals = current_expenses.totals_chart(spec)
+    units_lines = current_expenses.units_chart(spec)
+    units_bars = current_expenses.units_bar_chart(spec)
+    tasks = current_expenses.tasks_chart(spec, units[0])
+    yield "aggregate"
+    line.get_totals_chart_opt(**totals._asdict())
+    line.get_line_units_opt(**units_lines._asdict())
+    bar.get_bar_by_units_opt(**units_bars._asdict())
+    line.get_subunits_opt(**tasks._asdict(), top_k=20)
+    yield "options"
+
+
+def districts_page() -> Iterator[str]:
+    budget.load_districts()
+    cube.cuboids(districts.DATASET)
+    yield "load"
+    spec = districts.DistrictsFilter()
+    districts.details(spec)
+    types = districts.types(spec)
+    yield "filter"
+    totals = districts.totals_chart(spec)
+    types_lines = districts.types_chart(spec)
+    types_bars = districts.types_bar_chart(spec)
+    detail = districts.detail_chart(spec, types[0])
+    yield "aggregate"
+    line.get_totals_chart_opt(**totals._asdict())
+    line.get_subunits_opt(**types_lines._asdict())
+    bar.get_bar_by_types_opt(**types_bars._asdict())
+    line.get_subunits_opt(**detail._asdict())
+    yield "options"
+
+
+def incomes_expenses_page() -> Iterator[str]:
+    budget.load_incomes_expenses()
+    cube.cuboids(incomes_expenses.DATASET)
+    yield "load"
+    spec = incomes_expenses.IncomesExpensesFilter()
+    incomes_expenses.names()
+    yield "filter"
+    charts = [incomes_expenses.totals_chart(spec, part) for part in incomes_expenses.TITLES]
+    incomes_expenses.tables(spec)
+    yield "aggregate"
+    for chart in charts:
+        line.get_totals_chart_expe_inco_opt(**chart._asdict())
+    yield "options"
+
+
+PAGES: dict[str, Pipeline] = {
+    "Budzet_Krakowa": main_page,
+    "1_Wydatki_biezace": current_expenses_page,
+    "2_Wydatki_dla_dzielnic": districts_page,
+    "3_Dochody_i_wydatki": incomes_expenses_page,
+}
+
+
+def _timed(pipeline: Pipeline) -> dict[str, float]:
+    """Seconds spent in each stage of the pipeline, plus the total"""
+    stages = {}
+    start = last = time.perf_counter()
+    for stage in pipeline():
+        now = time.perf_counter()
+        stages[stage] = now - last
+        last = now
+    stages["total"] = last - start
+    return stages
+
+
+def measure(repeat: int = 5) -> dict[str, dict]:
+    """Cold run and best of `repeat` warm runs of every page"""
+    results = {}
+    for name, pipeline in PAGES.items():
+        cold = _timed(pipeline)
+        warm = [_timed(pipeline) for _ in range(repeat)]
+        results[name] = {
+            "cold": cold,
+            "warm": {stage: min(run[stage] for run in warm) for stage in cold},
+        }
+    return results
+
+
+def _scaled(df: pd.DataFrame, rows: int, keys: list[str]) -> pd.DataFrame:
+    """Frame repeated `rows` times, repeated key labels get a copy suffix"""
+    copies = []
+    for copy in range(rows):
+        part = df.copy()
+        if copy:
+            for key in keys:
+                part[key] = part[key].astype(str) + f" #{copy}"
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+
+def scale_dataset(source: Path, target: Path, rows: int, years: int) -> None:
+    """Write copy of budget CSV tree with `rows`× rows and `years`× budget years"""
+    for folder in ("wydatki_biezace", "districts", "doch_wyd"):
+        (target / folder).mkdir(parents=True, exist_ok=True)
+
+    def spread(labels: list[str]) -> list[tuple[str, int]]:
+        """(source year, new year) pairs, new years follow the real ones"""
+        first, count = int(min(labels)), len(labels)
+        return [(labels[idx % count], first + idx) for idx in range(count * years)]
+
+    current = {path.name[17:21]: path for path in budget.csv_files(source / "wydatki_biezace")}
+    for year, new_year in spread(sorted(current)):
+        df = _scaled(pd.read_csv(current[year]), rows, ["Jednostka"])
+        df.to_csv(target / "wydatki_biezace" / f"krk_budzet_01_01_{new_year}_wydatki_biezace.csv", index=False)
+    districts = {path.name[27:31]: path for path in budget.csv_files(source / "districts")}
+    for year, new_year in spread(sorted(districts)):
+        df = _scaled(pd.read_csv(districts[year]), rows, ["Wyszczególnienie"]).rename(
+            columns={f"Plan wydatków na 01.01.{year} r.": f"Plan wydatków na 01.01.{new_year} r."}
+        )
+        df.to_csv(target / "districts" / f"krk_pln_dla_dzielnic_01_01_{new_year}.csv", index=False)
+    for kind in ("Dochody", "Wydatki"):
+        tables = {path.name[8:12]: path for path in (source / "doch_wyd").glob(f"{kind}_*.csv")}
+        for year, new_year in spread(sorted(tables)):
+            df = _scaled(pd.read_csv(tables[year]), rows, ["Nazwa"])
+            df.to_csv(target / "doch_wyd" / f"{kind}_{new_year}.csv", index=False)
+    for name in budget.SUMMARY_NAMES:
+        df = pd.read_csv(source / f"{name}.csv")
+        pairs = spread(list(df.columns[1:]))
+        wide = pd.concat([df[["Nazwa"]], *(df[[year]].set_axis([str(new)], axis=1) for year, new in pairs)], axis=1)
+        wide.to_csv(target / f"{name}.csv", index=False)
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_scale(scale: str, repeat: int) -> dict:
+    rows, years = (int(factor) for factor in scale.split("x"))
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = budget.DATA_PATH
+        if (rows, years) != (1, 1):
+            data_path = Path(tmp)
+            scale_dataset(budget.DATA_PATH, data_path, rows, years)
+        worker = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_pages", "--worker", "--repeat", str(repeat)],
+            env={**os.environ, "KRK_BUDGET_DATA": str(data_path)},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(worker.stdout)
+
+
+def _worker(repeat: int) -> dict:
+    return {
+        "rows": int(sum(len(df) for df in budget.load_current_expenses().values())),
+        "snapshot": budget.fresh_snapshot() is not None,
+        "pages": measure(repeat),
+        "cache": cache.stats()._asdict(),
+    }
+
+
+def _report(results: dict, baseline: Optional[dict] = None) -> None:
+    for scale, result in results["scales"].items():
+        print(f"scale {scale} ({result['rows']} current expenses rows)")
+        for page, runs in result["pages"].items():
+            for run, stages in runs.items():
+                times = "  ".join(f"{stage} {seconds * 1000:8.2f}" for stage, seconds in stages.items())
+                row = f"  {page:>24} {run:>4}: {times} ms"
+                if baseline and scale in baseline["scales"]:
+                    old = baseline["scales"][scale]["pages"].get(page, {}).get(run, {}).get("total")
+                    if old:
+                        row += f"  x{old / stages['total']:.2f} vs {baseline['revision']}"
+                print(row)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", default=list(DEFAULT_SCALES), help="RxY factors")
+    parser.add_argument("--repeat", type=int, default=5, help="warm runs per page")
+    parser.add_argument("--output", type=Path, default=None, help="JSON results file")
+    parser.add_argument("--compare", type=Path, default=None, help="previous JSON results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    options = parser.parse_args(args)
+    if options.worker:
+        print(json.dumps(_worker(options.repeat)))
+        return
+    revision = _revision()
+    results = {
+        "revision": revision,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "scales": {scale: _run_scale(scale, options.repeat) for scale in options.scales},
+    }
+    output = options.output or RESULTS_PATH / f"pages-{revision or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    baseline = json.loads(options.compare.read_text()) if options.compare else None
+    _report(results, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Cold start profile of every dashboard page
+
+Run with ``python -m benchmarks.bench_startup [--no-snapshot]``. Every page is
+started in a fresh process, the way a new container serves its first viewer:
+the report shows the import time of Streamlit and of the app modules, the time
+to the first chart (first paint) and to the end of the page script, and the
+peak memory. Results are written as JSON next to the page benchmarks.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.bench_pages import RESULTS_PATH, _revision
+
+ROOT: Path = Path(__file__).resolve().parents[1]
+PAGES: dict[str, tuple[str, ...]] = {
+    "Budzet_Krakowa.py": ("charts.line", "engine.summary", "loader.watch"),
+    "pages/1_Wydatki_biezace.py": (
+        "charts.bar", "charts.line", "engine.current_expenses", "loader.watch"
+    ),
+    "pages/2_Wydatki_dla_dzielnic.py": (
+        "charts.bar", "charts.line", "engine.districts", "loader.watch"
+    ),
+    "pages/3_Dochody_i_wydatki.py": ("charts.line", "engine.incomes_expenses", "loader.watch"),
+}
+
+
+def _worker(page: str) -> dict:
+    """Import and first run timings of page in this (fresh) process"""
+    start = time.perf_counter()
+    import streamlit_echarts
+    from streamlit.testing.v1 import AppTest
+
+    streamlit_ready = time.perf_counter()
+    for module in PAGES[page]:
+        importlib.import_module(module)
+    modules_ready = time.perf_counter()
+
+    first_chart: list[float] = []
+    render = streamlit_echarts.st_echarts
+
+    def timed_echarts(*args, **kwargs):
+        first_chart.append(time.perf_counter())
+        return render(*args, **kwargs)
+
+    streamlit_echarts.st_echarts = timed_echarts
+    run_start = time.perf_counter()
+    app = AppTest.from_file(str(ROOT / page), default_timeout=300)
+    app.run()
+    finished = time.perf_counter()
+    if app.exception:
+        raise RuntimeError(f"{page}: {app.exception[0].value}")
+    return {
+        "import_streamlit": streamlit_ready - start,
+        "import_app": modules_ready - streamlit_ready,
+        "first_paint": (first_chart[0] if first_chart else finished) - run_start,
+        "script": finished - run_start,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _run_page(page: str, data_path: Path) -> dict:
+    worker = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--worker", page],
+        cwd=ROOT,
+        env={**os.environ, "KRK_BUDGET_DATA": str(data_path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(worker.stdout.strip().splitlines()[-1])
+
+
+def profile(use_snapshot: bool = True) -> dict[str, dict]:
+    """Cold start timings of every page, with or without the Parquet snapshot"""
+    from loader import budget, snapshot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp) / "budget"
+        shutil.copytree(budget.DATA_PATH, data_path, ignore=shutil.ignore_patterns(".ingest"))
+        if not use_snapshot:
+            shutil.rmtree(data_path / snapshot.SNAPSHOT_PATH.name, ignore_errors=True)
+        return {page: _run_page(page, data_path) for page in PAGES}
+
+
+def _report(results: dict) -> None:
+    print(f"snapshot: {results['snapshot']}")
+    for page, timings in results["pages"].items():
+        times = "  ".join(
+            f"{name} {value * 1000:8.1f} ms" for name, value in timings.items() if name != "max_rss_mb"
+        )
+        print(f"  {page:>32}: {times}  rss {timings['max_rss_mb']:.0f} MB")
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--no-snapshot", action="store_true", help="start from CSV files only")
+    parser.add_argument("--output", type=Path, default=None, help="JSON results file")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    options = parser.parse_args(args)
+    if options.worker:
+        print(json.dumps(_worker(options.worker)))
+        return
+    revision = _revision()
+    results = {
+        "revision": revision,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "snapshot": not options.no_snapshot,
+        "pages": profile(use_snapshot=not options.no_snapshot),
+    }
+    output = options.output or RESULTS_PATH / f"startup-{revision or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    _report(results)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,13 @@
 
 from typing import Iterable, Optional
 
+from charts.cache import memoized_options
+
 _title_color: str = "#f2f4f3"
 _background_color:str = "#1B2430"
 
 
+@memoized_options()
 def get_bar_by_units_opt(
     x: Iterable,
     series: list[dict],
@@ -56,6 +59,7 @@ def get_bar_by_units_opt(
                 "data": serie["data"],
                 "name": serie["name"],
                 "type": "bar",
+                "large": True,
                 "itemStyle": {"color": "#2ec4b6"},
             }
             for serie in series
@@ -66,6 +70,7 @@ def get_bar_by_units_opt(
 
     return options
 
+@memoized_options()
 def get_bar_by_types_opt(
     x: Iterable,
     series: list[dict],
@@ -117,6 +122,7 @@ def get_bar_by_types_opt(
                 "data": serie["data"],
                 "name": serie["name"],
                 "type": "bar",
+                "large": True,
                 "itemStyle": {"color": "#2ec4b6"},
                 "label": {
                     "show": True,
@@ -0,0 +1,66 @@
+"""Process wide LRU cache of ECharts option builders
+
+Options are keyed by a stable hash of the builder arguments, so identical
+charts of different sessions and reruns share one frozen options dict.
+"""
+
+import functools
+import hashlib
+import json
+import threading
+from typing import Any, Callable
+
+import numpy as np
+from cachetools import LRUCache, cached
+
+
+class FrozenDict(dict):
+    """Read only dict, still serializable as plain JSON object"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached chart options are read only, copy them first")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return id(self)
+
+
+def freeze(value: Any) -> Any:
+    """Deep copy of options with dicts made read only and lists made tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _plain(value: Any) -> Any:
+    """JSON value of numpy arrays and scalars, other types are not hashable by value"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"cannot key chart options by {type(value).__name__} argument")
+
+
+def options_key(*args, **kwargs) -> str:
+    """Stable hash of builder arguments, equal for equal data across sessions"""
+    payload = json.dumps([args, kwargs], sort_keys=True, default=_plain, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def memoized_options(maxsize: int = 64) -> Callable[[Callable[..., dict]], Callable[..., dict]]:
+    """Decorate options builder with bounded LRU cache of its frozen results"""
+
+    def decorator(builder: Callable[..., dict]) -> Callable[..., dict]:
+        cache = LRUCache(maxsize=maxsize)
+
+        @cached(cache, key=options_key, lock=threading.Lock())
+        @functools.wraps(builder)
+        def memoized(*args, **kwargs) -> dict:
+            return freeze(builder(*args, **kwargs))
+
+        memoized.cache = cache
+        return memoized
+
+    return decorator
@@ -0,0 +1,62 @@
+"""Short PLN amount labels (+1.23 MIL) of single values and whole arrays
+
+Labels of arrays are assembled as blocks of character codes with NumPy, so
+thousands of markPoints or table cells are labelled without formatting every
+value in Python: each distinct value is formatted once, halves are rounded up,
+zero is ``0`` and missing values (NaN) get an empty label.
+"""
+
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+UNITS: tuple[str, ...] = ("", " TYS", " MIL", " MLD", " TRL")
+MISSING: str = ""
+
+_UNIT_WIDTH = max(len(unit) for unit in UNITS)
+_UNIT_CODES = np.array(
+    [[ord(char) for char in unit.ljust(_UNIT_WIDTH, "\0")] for unit in UNITS], dtype=np.uint32
+)
+
+
+def _labels(values: np.ndarray) -> np.ndarray:
+    """Labels of non-zero finite values as a fixed width unicode array"""
+    size = np.abs(values)
+    magnitude = np.clip(np.floor(np.log10(size) / 3), 0, len(UNITS) - 1).astype(np.int64)
+    # multiplied before dividing, so halves of whole amounts stay exact and round up
+    cents = np.floor(size * 100 / 1000.0 ** magnitude + 0.5).astype(np.int64)
+    whole, fraction = np.divmod(cents, 100)
+    digits = np.maximum(np.floor(np.log10(np.maximum(whole, 1))).astype(np.int64) + 1, 1)
+    rows = np.arange(len(values))
+    # sign, integer digits, point, 2 decimals and unit, shorter labels end with NULs
+    width = 1 + int(digits.max(initial=1)) + 3 + _UNIT_WIDTH
+    codes = np.zeros((len(values), width), dtype=np.uint32)
+    codes[:, 0] = np.where(values < 0, ord("-"), ord("+"))
+    for position in range(width - 4 - _UNIT_WIDTH):
+        used = position < digits
+        power = 10 ** np.maximum(digits - 1 - position, 0)
+        codes[rows[used], 1 + position] = ord("0") + whole[used] // power[used] % 10
+    codes[rows, digits + 1] = ord(".")
+    codes[rows, digits + 2] = ord("0") + fraction // 10
+    codes[rows, digits + 3] = ord("0") + fraction % 10
+    for offset in range(_UNIT_WIDTH):
+        codes[rows, digits + 4 + offset] = _UNIT_CODES[magnitude, offset]
+    return codes.view(f"U{width}").ravel()
+
+
+def human_formats(values: Iterable[float]) -> list[str]:
+    """Labels of all values in one vectorized pass, e.g. +1.23 MIL, -450.00 TYS or 0"""
+    values = np.asarray(values, dtype=np.float64).ravel()
+    unique, inverse = np.unique(values, return_inverse=True)
+    amounts = np.isfinite(unique) & (unique != 0)
+    labels = np.full(len(unique), MISSING, dtype=object)
+    labels[unique == 0] = "0"
+    labels[amounts] = _labels(unique[amounts])
+    return labels[inverse].tolist()
+
+
+@lru_cache(maxsize=4096)
+def human_format(number: float) -> str:
+    """Label of one amount, cached for repeated values"""
+    return human_formats([number])[0]
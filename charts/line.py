@@ -1,25 +1,16 @@
 """Streamlit ECharts Line chart defs"""
 
 from typing import Iterable, Optional
-from math import log, floor
+
+from charts.cache import memoized_options
+from charts.model import cap_series
 
 
 _title_color: str = "#f2f4f3"
 _background_color:str = "#1B2430"
 
-def human_format(number) -> str:
-    units = ["", " TYS", " MIL", " MLD", " TRL"]
-    k = 1000.0
-    prefix = "+"
-    if number < 0:
-        number *= -1
-        prefix = "-"
-    elif number == 0:
-        return "0"
-    magnitude = int(floor(log(number, k)))
-    return f"{prefix}%.2f%s" % (number / k**magnitude, units[magnitude])
-
 
+@memoized_options()
 def get_totals_chart_opt(
     x: Iterable,
     series: list[dict],
@@ -67,13 +58,18 @@ def get_totals_chart_opt(
     return options
 
 
+@memoized_options()
 def get_line_units_opt(
     x: Iterable,
     series: list[dict],
     title: str,
     y_label: str,
     legend: Optional[list[str]] = None,
+    top_k: Optional[int] = None,
+    rank_by: str = "latest",
 ) -> dict:
+    if top_k:
+        series, legend = cap_series(series, top_k, rank_by, legend)
     options = {
         "grid": {
             "bottom": '25%',
@@ -118,6 +114,7 @@ def get_line_units_opt(
                 "data": serie["data"],
                 "type": "line",
                 "smooth": True,
+                "sampling": "lttb",
                 "label": {
                     "show": False,
                     "position": "top",
@@ -137,13 +134,18 @@ def get_line_units_opt(
     return options
 
 
+@memoized_options()
 def get_subunits_opt(
     x: Iterable,
     series: list[dict],
     title: str,
     y_label: str,
     legend: Optional[list[str]] = None,
+    top_k: Optional[int] = None,
+    rank_by: str = "latest",
 ) -> dict:
+    if top_k:
+        series, legend = cap_series(series, top_k, rank_by, legend)
     options = {
         "grid": {
             "left": '2%',
@@ -187,6 +189,7 @@ def get_subunits_opt(
                 "data": serie["data"],
                 "type": "line",
                 "smooth": True,
+                "sampling": "lttb",
                 "label": {
                     "show": True,
                     "position": "top",
@@ -206,6 +209,7 @@ def get_subunits_opt(
 
     return options
 
+@memoized_options()
 def get_totals_chart_expe_inco_opt(
     x: Iterable,
     series: list[dict],
@@ -213,41 +217,6 @@ def get_totals_chart_expe_inco_opt(
     y_label: str,
     legend: Optional[list[str]] = None,
 ) -> dict:
-    series_mod = []
-    for elem in series:
-        mark_points_data = []
-        prev_val = None
-        for idx, val in enumerate(elem["data"]):
-            if prev_val:
-                diff = float(val - prev_val)
-                color = elem["up"] if diff > 0 else elem["down"]
-                symbol_rotate = 0 if diff > 0 else -180
-                mark_points_data.append(
-                    {
-                        "name": f"P{idx}",
-                        "value": human_format(diff),
-                        "xAxis": idx,
-                        "yAxis": val,
-                        "symbol": "triangle",
-                        "itemStyle": {"color": color},
-                        "symbolRotate": symbol_rotate,
-                        "symbolSize": 20,
-                        "symbolOffset": [0, "150%"],
-                    }
-                )
-            prev_val = val
-
-        series_mod.append({
-            "name": elem["name"],
-            "data": elem["data"],
-            "type": "line",
-            "lineStyle": {"color": elem["color"]},
-            "itemStyle": {"color": elem["color"]},
-            "smooth": True,
-            "label": {"show": True, "position": "top"},
-            "markPoint": {"data": mark_points_data},
-            })
-
     options = {
         "backgroundColor": _background_color,
         "title": {
@@ -280,7 +249,7 @@ def get_totals_chart_expe_inco_opt(
                 },
             },
         },
-        "series": series_mod,
+        "series": series,
     }
     if legend:
         options["legend"] = {
@@ -1,19 +1,65 @@
 """Functions for manipulating data for ease of passing values into charts"""
 
+from typing import Hashable, Iterable, Optional
+
+import numpy as np
 import pandas as pd
 
 
-def df_to_series(df: pd.DataFrame) -> list[dict]:
+def _to_series(
+    names: Iterable[Hashable], values: np.ndarray, decimals: Optional[int] = None
+) -> list[dict]:
+    """Zip names with rows of 2D values block, NaN values become None (null)"""
+    if decimals is not None:
+        values = values.round(decimals)
+    nan_mask = np.isnan(values)
+    if nan_mask.any():
+        values = values.astype(object)
+        values[nan_mask] = None
+    return [
+        {"name": str(name), "data": data} for name, data in zip(names, values.tolist())
+    ]
+
+
+def df_to_series(df: pd.DataFrame, decimals: Optional[int] = None) -> list[dict]:
     """Transform rows of data into series and 1st df column into series names"""
-    series = []
-    label_col = df.columns[0]
-    other_cols = df.columns[1:]
-    for _, row in df.iterrows():
-        series.append(
-            {
-                "name": str(row[label_col]),
-                "data": [row[col] for col in other_cols],
-            }
-        )
-
-    return series
+    return _to_series(
+        df.iloc[:, 0].tolist(), df.iloc[:, 1:].to_numpy(dtype=np.float64), decimals
+    )
+
+
+OTHERS: str = "Pozostałe"
+RANKINGS: tuple[str, ...] = ("latest", "variance")
+
+
+def cap_series(
+    series: list[dict],
+    top_k: int,
+    rank_by: str = "latest",
+    legend: Optional[list[str]] = None,
+) -> tuple[list[dict], Optional[list[str]]]:
+    """Keep `top_k` series ranked by latest value or variance, sum rest into others
+
+    Kept series stay in their original order and are followed by the others
+    series, legend entries (matching series by position) are capped alike.
+    """
+    if top_k <= 0 or len(series) <= top_k:
+        return series, legend
+    values = np.array(
+        [[np.nan if val is None else val for val in serie["data"]] for serie in series],
+        dtype=np.float64,
+    )
+    if rank_by == "latest":
+        score = np.abs(np.nan_to_num(values[:, -1]))
+    elif rank_by == "variance":
+        score = np.nan_to_num(np.nanvar(values, axis=1))
+    else:
+        raise ValueError(f"rank_by must be one of {RANKINGS}, got {rank_by!r}")
+    kept = np.sort(np.argsort(-score, kind="stable")[:top_k])
+    rest = np.ones(len(series), dtype=bool)
+    rest[kept] = False
+    others = {"name": OTHERS, "data": np.nansum(values[rest], axis=0).tolist()}
+    capped = [series[idx] for idx in kept] + [others]
+    if legend is not None:
+        legend = [legend[idx] for idx in kept] + [OTHERS]
+    return capped, legend
@@ -0,0 +1,72 @@
+"""Streamlit ECharts treemap and sunburst defs of a budget classification subtree"""
+
+from charts.cache import memoized_options
+
+_title_color: str = "#f2f4f3"
+_background_color: str = "#1B2430"
+
+
+def _base(title: str, y_label: str) -> dict:
+    return {
+        "backgroundColor": _background_color,
+        "title": {
+            "text": title,
+            "left": "center",
+            "top": "top",
+            "textStyle": {
+                "color": _title_color,
+            },
+        },
+        "tooltip": {
+            "trigger": "item",
+            "formatter": f"{{b}}: {{c}} {y_label}",
+        },
+    }
+
+
+@memoized_options()
+def get_treemap_opt(data: list[dict], title: str, y_label: str) -> dict:
+    """Treemap of the visible subtree, nested children are drawn inside their parents"""
+    return {
+        **_base(title, y_label),
+        "series": [
+            {
+                "type": "treemap",
+                "data": data,
+                "top": "10%",
+                "roam": False,
+                "nodeClick": False,
+                "breadcrumb": {"show": False},
+                "label": {"show": True, "formatter": "{b}"},
+                "upperLabel": {"show": True, "height": 24, "color": _title_color},
+                "levels": [
+                    {
+                        "itemStyle": {
+                            "borderColor": _background_color, "borderWidth": 4, "gapWidth": 4
+                        }
+                    },
+                    {"itemStyle": {"borderColorSaturation": 0.6, "gapWidth": 1}},
+                ],
+            }
+        ],
+    }
+
+
+@memoized_options()
+def get_sunburst_opt(data: list[dict], title: str, y_label: str) -> dict:
+    """Sunburst of the visible subtree, one ring per level"""
+    return {
+        **_base(title, y_label),
+        "series": [
+            {
+                "type": "sunburst",
+                "data": data,
+                "radius": ["15%", "90%"],
+                "center": ["50%", "55%"],
+                "nodeClick": False,
+                "sort": None,
+                "label": {"rotate": "radial", "color": _title_color, "minAngle": 5},
+                "itemStyle": {"borderColor": _background_color, "borderWidth": 1},
+            }
+        ],
+    }
@@ -0,0 +1,138 @@
+"""Process wide cache of dashboard results shared by all sessions
+
+Memoized engine functions are the nodes of the page computation graph: load
+(``loader.budget``) → filter and aggregate (``loader.cube``) → per-chart
+transform → options (``charts.cache``). Results are keyed by the function and
+its own inputs only, so a chart-local widget recomputes just the nodes that
+take it, and every viewer with the same sidebar selection reuses one
+computation. Each result records the datasets it read, directly or through
+the nodes it called, and stays valid until one of them is reloaded. The
+multiselect fields a filter spec declares in ``SELECTIONS`` are normalized
+(the order of their selected options does not matter). Entries are evicted
+in LRU order once their estimated size exceeds ``KRK_BUDGET_CACHE_MB``
+megabytes. Cached results are shared, callers must
+treat them as read only.
+"""
+
+import functools
+import os
+import pickle
+import threading
+from typing import Any, Callable, NamedTuple, Optional, TypeVar
+
+import pandas as pd
+from cachetools import LRUCache
+
+from loader import budget
+
+MAX_BYTES: int = int(float(os.environ.get("KRK_BUDGET_CACHE_MB", 256)) * 2**20)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Stats(NamedTuple):
+    hits: int
+    misses: int
+    entries: int
+    bytes: int
+    max_bytes: int
+    loaded_hits: int
+    loaded_misses: int
+    loaded_entries: int
+
+
+class Node(NamedTuple):
+    value: Any
+    datasets: tuple[Optional[str], ...]
+    versions: tuple[int, ...]
+
+
+def sizeof(value: Any) -> int:
+    """Estimated memory of cached result in bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (tuple, list)) and any(
+        isinstance(item, (pd.DataFrame, pd.Series)) for item in value
+    ):
+        return sum(sizeof(item) for item in value)
+    if isinstance(value, dict) and any(
+        isinstance(item, (pd.DataFrame, pd.Series)) for item in value.values()
+    ):
+        return sum(sizeof(item) for item in value.values())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+_cache: LRUCache = LRUCache(maxsize=MAX_BYTES, getsizeof=lambda node: sizeof(node.value))
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _normalized(value: Any) -> Any:
+    """Filter spec with its `SELECTIONS` fields sorted, other arguments as they are"""
+    selections = getattr(type(value), "SELECTIONS", ())
+    if not isinstance(value, tuple) or not selections:
+        return value
+    return value._replace(
+        **{field: tuple(sorted(getattr(value, field), key=str)) for field in selections}
+    )
+
+
+def key(function: Callable, *args, **kwargs) -> tuple:
+    return (
+        function.__module__,
+        function.__qualname__,
+        tuple(_normalized(arg) for arg in args),
+        tuple(sorted(kwargs.items())),
+    )
+
+
+def memoized(function: F) -> F:
+    """Cache results of engine function across sessions until their data is reloaded"""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        global _hits, _misses
+        entry_key = key(function, *args, **kwargs)
+        with _lock:
+            node = _cache.get(entry_key)
+        if node is not None and budget.versions(node.datasets) == node.versions:
+            with _lock:
+                _hits += 1
+            # the caller depends on the data of the reused result as well
+            for dataset in node.datasets:
+                budget.read(dataset)
+            return node.value
+        with _lock:
+            _misses += 1
+        started = budget.version()
+        with budget.recording() as datasets:
+            value = function(*args, **kwargs)
+        datasets = tuple(sorted(datasets, key=str))
+        versions = budget.versions(datasets)
+        if budget.version() != started:
+            return value  # data was reloaded meanwhile, the result may mix versions
+        with _lock:
+            try:
+                _cache[entry_key] = Node(value, datasets, versions)
+            except ValueError:
+                pass  # larger than the whole cache
+        return value
+
+    return wrapper
+
+
+def stats() -> Stats:
+    """Hit/miss counters and size of derived results and of loaded source frames"""
+    with _lock:
+        derived = (_hits, _misses, len(_cache), int(_cache.currsize), MAX_BYTES)
+    return Stats(*derived, *budget.stats())
+
+
+def clear() -> None:
+    global _hits, _misses
+    with _lock:
+        _cache.clear()
+        _hits = _misses = 0
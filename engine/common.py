@@ -0,0 +1,58 @@
+"""Chart-ready data shared by the dashboard engines"""
+
+from typing import Iterable, NamedTuple, Optional
+
+from engine import deltas
+
+INCOME_COLORS: dict[str, str] = {"color": "#0a9396", "up": "#588157", "down": "#d90429"}
+EXPENSE_COLORS: dict[str, str] = {"color": "#d62828", "up": "#d90429", "down": "#588157"}
+TOTAL_COLORS: dict[str, str] = {"color": "#f77f00", "up": "#a53860", "down": "#014f86"}
+
+
+class Chart(NamedTuple):
+    """Keyword arguments of the charts.line / charts.bar option builders"""
+
+    x: list
+    series: list[dict]
+    title: str
+    y_label: str = "PLN"
+    legend: Optional[list[str]] = None
+
+
+class TreeChart(NamedTuple):
+    """Keyword arguments of the charts.tree option builders"""
+
+    data: list[dict]
+    title: str
+    y_label: str = "PLN"
+
+
+def selected(options: Iterable, selection: Iterable) -> list:
+    """Options kept by selection in options order, empty selection keeps all"""
+    selection = set(selection)
+    return [option for option in options if not selection or option in selection]
+
+
+def delta_series(names: list[str], values: list[list[float]], colors: list[dict]) -> list[dict]:
+    """Lines with markPoints showing the change against previous year, one per name"""
+    points = deltas.mark_points(
+        values, [color["up"] for color in colors], [color["down"] for color in colors]
+    )
+    return [
+        {
+            "name": name,
+            "data": data,
+            "type": "line",
+            "lineStyle": {"color": color["color"]},
+            "itemStyle": {"color": color["color"]},
+            "smooth": True,
+            "label": {"show": True, "position": "top"},
+            "markPoint": {"data": data_points},
+        }
+        for name, data, color, data_points in zip(names, values, colors, points)
+    ]
+
+
+def totals_series(values: Iterable[float], name: str = "Suma") -> list[dict]:
+    """Totals line with markPoints showing the change against previous year"""
+    return delta_series([name], [list(values)], [TOTAL_COLORS])
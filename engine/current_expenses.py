@@ -0,0 +1,119 @@
+"""Current expenses dashboard: units and their tasks"""
+
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+from charts.model import df_to_series
+from engine import deltas
+from engine.cache import memoized
+from engine.common import Chart, selected, totals_series
+from loader import cube, facts
+
+DATASET: str = "wydatki_biezace"
+
+
+class CurrentExpensesFilter(NamedTuple):
+    years: tuple[str, ...] = ()
+    units: tuple[str, ...] = ()
+    SELECTIONS = ("years", "units")
+
+
+@memoized
+def years() -> list[str]:
+    """Budget dates (01_01_YYYY) in ascending order"""
+    return cube.years(DATASET)
+
+
+@memoized
+def units(spec: CurrentExpensesFilter = CurrentExpensesFilter()) -> list[str]:
+    """Selected units or all units of the oldest budget, sorted"""
+    if spec.units:
+        return sorted(spec.units)
+    return sorted(cube.members(DATASET, "Jednostka", where={facts.YEAR: years()[:1]}))
+
+
+def selected_years(spec: CurrentExpensesFilter) -> list[str]:
+    return selected(years(), spec.years)
+
+
+@memoized
+def unit_totals(spec: CurrentExpensesFilter) -> pd.DataFrame:
+    """Jednostka column and one column of totals per selected year"""
+    return cube.rollup(
+        DATASET, ["Jednostka"], selected_years(spec), where={"Jednostka": spec.units}
+    )
+
+
+@memoized
+def totals(spec: CurrentExpensesFilter) -> dict[str, float]:
+    """Total of the selected units in every selected year"""
+    return cube.totals(DATASET, selected_years(spec), where={"Jednostka": spec.units})
+
+
+@memoized
+def unit_changes(spec: CurrentExpensesFilter) -> pd.DataFrame:
+    """Year over year changes and CAGR of every selected unit"""
+    return deltas.from_wide(unit_totals(spec))
+
+
+@memoized
+def totals_chart(spec: CurrentExpensesFilter) -> Chart:
+    return Chart(
+        x=selected_years(spec),
+        series=totals_series(totals(spec).values()),
+        title="Suma wydatków na zadania bieżące ogółem",
+    )
+
+
+@memoized
+def units_chart(spec: CurrentExpensesFilter, ascending: bool = True, top_n: int = 10) -> Chart:
+    """Yearly totals of first `top_n` units in alphabetical order"""
+    df_units_sorted = (
+        unit_totals(spec).sort_values(by="Jednostka", ascending=ascending).head(top_n)
+    )
+    return Chart(
+        x=selected_years(spec),
+        series=df_to_series(df_units_sorted),
+        title=f"Top {top_n} alfabetycznie jednostek i ich budżet na bieżące zadana",
+        legend=list(df_units_sorted["Jednostka"]),
+    )
+
+
+@memoized
+def units_bar_chart(
+    spec: CurrentExpensesFilter, ascending: bool = True, top_n: Optional[int] = None
+) -> Chart:
+    """Units budget of the newest selected year, without empty units"""
+    newest_values = selected_years(spec)[-1]
+    sub_df = unit_totals(spec)[["Jednostka", newest_values]].sort_values(
+        by=newest_values, ascending=ascending
+    )
+    sub_df = sub_df[sub_df[newest_values] > 0]
+    if top_n:
+        sub_df = sub_df.head(top_n)
+    return Chart(
+        x=list(sub_df["Jednostka"]),
+        series=[{"data": list(sub_df[newest_values]), "name": "Jednostka"}],
+        title=f"Wydatki na zadania ogółem {newest_values}",
+    )
+
+
+@memoized
+def unit_tasks(spec: CurrentExpensesFilter, unit: str) -> pd.DataFrame:
+    """Nazwa zadania column and totals per selected year of unit tasks planned every year"""
+    years_list = selected_years(spec)
+    df_subunits = cube.rollup(DATASET, ["Nazwa zadania"], years_list, where={"Jednostka": [unit]})
+    return df_subunits[(df_subunits[years_list] > 0).all(axis=1)]
+
+
+@memoized
+def tasks_chart(spec: CurrentExpensesFilter, unit: str) -> Chart:
+    """History of unit tasks planned in every selected year"""
+    df_subunits = unit_tasks(spec, unit)
+    return Chart(
+        x=selected_years(spec),
+        series=df_to_series(df_subunits),
+        title=f"Zadania jed.: {unit}",
+        legend=[str(n)[:50] for n in list(df_subunits["Nazwa zadania"])],
+    )
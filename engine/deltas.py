@@ -0,0 +1,109 @@
+"""Year over year changes of budget series computed for all series at once
+
+Values are a block with one row per series and one column per selected year.
+Absolute change and percentage change are taken against the previous selected
+year, CAGR between the first and the last year of every series. A change from
+0 is a real change (its percentage is undefined), missing values (NaN) have no
+change. The same block feeds the markPoints of the totals charts and the
+changes tables of the dashboards and the API.
+"""
+
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from charts.formatting import human_formats
+
+COLUMNS: list[str] = ["Nazwa", "Rok", "Kwota", "Zmiana", "Zmiana %", "CAGR %"]
+
+
+class Deltas(NamedTuple):
+    change: np.ndarray  # (series, years), NaN for the first year
+    pct_change: np.ndarray  # (series, years), NaN where the previous value is 0
+    cagr: np.ndarray  # (series,), NaN unless both ends are positive
+
+
+def _block(values: np.ndarray) -> np.ndarray:
+    """2D float block of series values, None becomes NaN, no series gives (0, 0)"""
+    values = np.asarray(values, dtype=np.float64)
+    return values if values.ndim == 2 else values.reshape(len(values), 0)
+
+
+def year_numbers(years: Iterable[str]) -> np.ndarray:
+    """Years of budget dates (01.01.YYYY, 01_01_YYYY or YYYY)"""
+    return np.array([int(str(year)[-4:]) for year in years], dtype=np.int64)
+
+
+def deltas(values: np.ndarray, years: Optional[np.ndarray] = None) -> Deltas:
+    """Changes of every series, CAGR spans `years` (consecutive years by default)"""
+    values = _block(values)
+    previous, current = values[:, :-1], values[:, 1:]
+    change = np.full(values.shape, np.nan)
+    change[:, 1:] = current - previous
+    pct_change = np.full(values.shape, np.nan)
+    np.divide(
+        change[:, 1:] * 100, np.abs(previous), out=pct_change[:, 1:], where=previous != 0
+    )
+    cagr = np.full(len(values), np.nan)
+    if values.shape[1] > 1:
+        span = (years[-1] - years[0]) if years is not None else values.shape[1] - 1
+        first, last = values[:, 0], values[:, -1]
+        valid = (first > 0) & (last > 0) & (span > 0)
+        ratio = np.divide(last, first, out=np.ones(len(values)), where=valid)
+        cagr = np.where(valid, (ratio ** (1 / max(span, 1)) - 1) * 100, np.nan)
+    return Deltas(change, pct_change, cagr)
+
+
+def mark_points(values: np.ndarray, up: Iterable[str], down: Iterable[str]) -> list[list[dict]]:
+    """markPoints data of every series: triangles with the change against previous year"""
+    values = _block(values)
+    change = deltas(values).change
+    rows, columns = np.nonzero(~np.isnan(change))
+    labels = human_formats(change[rows, columns])
+    rises = (change[rows, columns] > 0).tolist()
+    series_points: list[list[dict]] = [[] for _ in range(len(values))]
+    colors = list(zip(up, down))
+    for row, idx, label, val, rise in zip(
+        rows.tolist(), columns.tolist(), labels, values[rows, columns].tolist(), rises
+    ):
+        series_points[row].append(
+            {
+                "name": f"P{idx}",
+                "value": label,
+                "xAxis": idx,
+                "yAxis": val,
+                "symbol": "triangle",
+                "itemStyle": {"color": colors[row][0] if rise else colors[row][1]},
+                "symbolRotate": 0 if rise else -180,
+                "symbolSize": 20,
+                "symbolOffset": [0, "150%"],
+            }
+        )
+    return series_points
+
+
+def frame(names: list[str], years: list[str], values: np.ndarray) -> pd.DataFrame:
+    """Long table of amounts and their changes, one row per series and year"""
+    values = _block(values).reshape(len(names), len(years))
+    result = deltas(values, year_numbers(years))
+    return pd.DataFrame(
+        {
+            "Nazwa": np.repeat(names, len(years)),
+            "Rok": np.tile(years, len(names)),
+            "Kwota": values.ravel(),
+            "Zmiana": result.change.ravel(),
+            "Zmiana %": result.pct_change.ravel().round(2),
+            "CAGR %": np.repeat(result.cagr, len(years)).round(2),
+        },
+        columns=COLUMNS,
+    )
+
+
+def from_wide(df: pd.DataFrame) -> pd.DataFrame:
+    """Changes table of wide frame: names in the 1st column, one column per year"""
+    return frame(
+        df.iloc[:, 0].astype(str).tolist(),
+        list(df.columns[1:]),
+        df.iloc[:, 1:].to_numpy(dtype=np.float64),
+    )
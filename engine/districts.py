@@ -0,0 +1,156 @@
+"""Districts dashboard: budget planned for districts by type and detail"""
+
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+from charts.model import df_to_series
+from engine import deltas
+from engine.cache import memoized
+from engine.common import Chart, TreeChart, selected, totals_series
+from loader import cube, hierarchy
+
+DATASET: str = "districts"
+
+
+class DistrictsFilter(NamedTuple):
+    years: tuple[str, ...] = ()
+    types: tuple[str, ...] = ()
+    details: tuple[str, ...] = ()
+    SELECTIONS = ("years", "types", "details")
+
+
+@memoized
+def years() -> list[str]:
+    """Budget dates (01.01.YYYY) in ascending order"""
+    return cube.years(DATASET)
+
+
+@memoized
+def types(spec: DistrictsFilter = DistrictsFilter()) -> list[str]:
+    """Types (Rodzaj) having any of the selected details"""
+    return cube.members(DATASET, "Rodzaj", where={"Wyszczególnienie": spec.details})
+
+
+@memoized
+def details(spec: DistrictsFilter = DistrictsFilter()) -> list[str]:
+    """Details (Wyszczególnienie) of the selected types"""
+    return cube.members(DATASET, "Wyszczególnienie", where={"Rodzaj": spec.types})
+
+
+def selected_years(spec: DistrictsFilter) -> list[str]:
+    return selected(years(), spec.years)
+
+
+@memoized
+def type_totals(spec: DistrictsFilter) -> pd.DataFrame:
+    """Rodzaj column and one column of totals per selected year"""
+    return cube.rollup(
+        DATASET,
+        ["Rodzaj"],
+        selected_years(spec),
+        where={"Wyszczególnienie": spec.details, "Rodzaj": spec.types},
+    )
+
+
+@memoized
+def totals(spec: DistrictsFilter) -> dict[str, float]:
+    """Total of the selected details in every selected year"""
+    return cube.totals(DATASET, selected_years(spec), where={"Wyszczególnienie": spec.details})
+
+
+@memoized
+def type_details(spec: DistrictsFilter, rodzaj: str) -> pd.DataFrame:
+    """Wyszczególnienie column and totals per selected year of details of type"""
+    return cube.rollup(
+        DATASET,
+        ["Wyszczególnienie"],
+        selected_years(spec),
+        where={"Wyszczególnienie": spec.details, "Rodzaj": [rodzaj]},
+    )
+
+
+@memoized
+def type_changes(spec: DistrictsFilter) -> pd.DataFrame:
+    """Year over year changes and CAGR of every type (Rodzaj)"""
+    return deltas.from_wide(type_totals(spec))
+
+
+@memoized
+def totals_chart(spec: DistrictsFilter) -> Chart:
+    return Chart(
+        x=selected_years(spec),
+        series=totals_series(totals(spec).values()),
+        title="Suma kwoty budżetu na dzielnice",
+    )
+
+
+@memoized
+def types_chart(spec: DistrictsFilter) -> Chart:
+    df_sum_type = type_totals(spec)
+    return Chart(
+        x=selected_years(spec),
+        series=df_to_series(df_sum_type),
+        title="Suma budżetu dla dzielnic na rodzaje",
+        legend=list(df_sum_type["Rodzaj"]),
+    )
+
+
+@memoized
+def types_bar_chart(
+    spec: DistrictsFilter, ascending: bool = True, top_n: Optional[int] = None
+) -> Chart:
+    """Types budget of the newest selected year, without empty types"""
+    newest_value = selected_years(spec)[-1]
+    df_sum_type = type_totals(spec)[["Rodzaj", newest_value]].sort_values(
+        by=newest_value, ascending=ascending
+    )
+    df_sum_type = df_sum_type[df_sum_type[newest_value] > 0]
+    if top_n:
+        df_sum_type = df_sum_type.head(top_n)
+    return Chart(
+        x=list(df_sum_type["Rodzaj"]),
+        series=[{"data": list(df_sum_type[newest_value]), "name": "Rodzaj"}],
+        title=f"Budżet dzielnic w rozbicu na rodzaj na {newest_value}",
+    )
+
+
+@memoized
+def detail_chart(spec: DistrictsFilter, rodzaj: str) -> Chart:
+    df_detail = type_details(spec, rodzaj)
+    return Chart(
+        x=selected_years(spec),
+        series=df_to_series(df_detail),
+        title=f"Szegóły budżetu dla: {rodzaj}",
+        legend=list(df_detail["Wyszczególnienie"]),
+    )
+
+
+@memoized
+def tree() -> hierarchy.Tree:
+    """Dział → Rozdział classification tree with sums of every node and year"""
+    return hierarchy.districts()
+
+
+@memoized
+def tree_nodes() -> dict[str, str]:
+    """Ids of the nodes having children (the whole budget and every Dział) by label"""
+    classification = tree()
+    return {
+        f"{node} {classification.names[position]}".strip(): node
+        for position, node in enumerate(classification.ids)
+        if classification.ends[position] > position + 1
+    }
+
+
+@memoized
+def tree_chart(spec: DistrictsFilter, node: str = hierarchy.ROOT, depth: int = 2) -> TreeChart:
+    """Visible part of the tree: `depth` levels below node in the newest selected year"""
+    classification = tree()
+    year = selected_years(spec)[-1]
+    path = [
+        classification.names[classification.position(item)] for item in classification.path(node)
+    ]
+    return TreeChart(
+        data=classification.subtree(node, depth, year), title=f"{' / '.join(path)} ({year})"
+    )
@@ -0,0 +1,105 @@
+"""Incomes and expenses dashboard: plans of gmina and powiat by Dział"""
+
+from typing import NamedTuple
+
+import pandas as pd
+
+from engine import deltas
+from engine.cache import memoized
+from engine.common import EXPENSE_COLORS, INCOME_COLORS, Chart, delta_series, selected
+from loader import budget, cube
+
+DATASET: str = "doch_wyd"
+TITLES: dict[str, str] = {
+    "Ogółem": "Histria planowanych dochodów i wydatków ogółem w budżecie",
+    "Gmina": "Planowane dochody i przychody gminy",
+    "Powiat": "Planowane dochody i przychody powiatu",
+}
+
+
+class IncomesExpensesFilter(NamedTuple):
+    years: tuple[str, ...] = ()
+    names: tuple[str, ...] = ()
+    SELECTIONS = ("years", "names")
+
+
+@memoized
+def years() -> list[str]:
+    """Budget dates (01.01.YYYY) in ascending order"""
+    return [f"01.01.{year}" for year in cube.years(DATASET)]
+
+
+@memoized
+def names() -> list[str]:
+    """Names of incomes and expenses sections, sorted"""
+    return sorted(cube.members(DATASET, "Nazwa"))
+
+
+def selected_years(spec: IncomesExpensesFilter) -> list[str]:
+    return selected(years(), spec.years)
+
+
+@memoized
+def tables(spec: IncomesExpensesFilter) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Incomes and expenses tables with Ogółem/Gmina/Powiat columns per year"""
+    years_list = selected_years(spec)
+    df_doch = pd.DataFrame(columns=("Nazwa", "Ogółem", "Gmina", "Powiat"))
+    df_wyda = pd.DataFrame(columns=("Nazwa", "Ogółem", "Gmina", "Powiat"))
+    incomes, expenses = budget.load_incomes_expenses()
+    # only the files of the selected years are parsed
+    selected_files = [year[-4:] for year in years_list]
+    for year in (year for year in incomes if year in selected_files):
+        df_doch = df_doch.merge(incomes[year], how="outer", on=["Nazwa"], suffixes=("", year))
+    for year in (year for year in expenses if year in selected_files):
+        df_wyda = df_wyda.merge(expenses[year], how="outer", on=["Nazwa"], suffixes=("", year))
+    df_wyda = df_wyda.drop(columns=["Ogółem", "Gmina", "Powiat"]).fillna(0)
+    df_doch = df_doch.drop(columns=["Ogółem", "Gmina", "Powiat"]).fillna(0)
+    df_doch, df_wyda = (
+        df[[
+            column for idx, column in enumerate(df.columns)
+            if idx == 0 or any(fyear[-4:] in column for fyear in years_list)
+        ]]
+        for df in [df_doch, df_wyda]
+    )
+    if spec.names:
+        df_doch = df_doch[df_doch["Nazwa"].isin(spec.names)]
+        df_wyda = df_wyda[df_wyda["Nazwa"].isin(spec.names)]
+    return df_doch, df_wyda
+
+
+@memoized
+def totals(spec: IncomesExpensesFilter, table: str, part: str) -> list[float]:
+    """Yearly totals of dochody/wydatki table part (Ogółem, Gmina, Powiat)"""
+    return list(
+        cube.totals(
+            DATASET,
+            [year[-4:] for year in selected_years(spec)],
+            where={"Tabela": [table], "Część": [part], "Nazwa": spec.names},
+        ).values()
+    )
+
+
+@memoized
+def changes(spec: IncomesExpensesFilter) -> pd.DataFrame:
+    """Year over year changes and CAGR of incomes and expenses of every part"""
+    parts = [(table, part) for part in TITLES for table in ("dochody", "wydatki")]
+    return deltas.frame(
+        [f"{table} {part}" for table, part in parts],
+        selected_years(spec),
+        [totals(spec, table, part) for table, part in parts],
+    )
+
+
+@memoized
+def totals_chart(spec: IncomesExpensesFilter, part: str) -> Chart:
+    """Incomes against expenses of part (Ogółem, Gmina, Powiat)"""
+    return Chart(
+        x=selected_years(spec),
+        series=delta_series(
+            ["Dochody ogółem", "Wydatki ogółem"],
+            [totals(spec, "dochody", part), totals(spec, "wydatki", part)],
+            [INCOME_COLORS, EXPENSE_COLORS],
+        ),
+        title=TITLES[part],
+        legend=["Dochody ogółem", "Wydatki ogółem"],
+    )
@@ -0,0 +1,166 @@
+"""Full-text search over tasks, units, district items and income/expense names
+
+The inverted index is built once from all budget years and cached until the
+data is reloaded. Texts and queries are folded to lowercase ASCII (Polish
+diacritics included, ``Łódź`` matches ``lodz``) and every query word matches
+words starting with it. Terms are kept sorted with their postings stored one
+after another, so the documents of all terms sharing a prefix are a single
+slice found by binary search. A hit carries the filter of its multi-year
+series.
+"""
+
+import re
+import unicodedata
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from engine.cache import memoized
+from engine.common import Chart, totals_series
+from loader import budget, cube, facts, tasks
+
+TASK: str = "Zadanie"
+UNIT: str = "Jednostka"
+DISTRICT: str = "Dzielnice"
+LIMIT: int = 20
+
+_FOLDED = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+_WORD = re.compile(r"\w+")
+
+
+class Hit(NamedTuple):
+    kind: str
+    name: str
+    context: str
+    dataset: str
+    where: tuple[tuple[str, str], ...]
+
+
+class Index(NamedTuple):
+    hits: list[Hit]
+    terms: np.ndarray  # sorted folded words
+    # documents of term t are postings[offsets[t]:offsets[t + 1]], ascending
+    offsets: np.ndarray
+    postings: np.ndarray
+
+
+def fold(text: str) -> str:
+    """Lowercase text without diacritics"""
+    decomposed = unicodedata.normalize("NFKD", str(text).translate(_FOLDED))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def words(text: str) -> list[str]:
+    return _WORD.findall(fold(text))
+
+
+def _task_texts() -> dict[tuple[str, str], set[str]]:
+    """Acronyms and every yearly name of each task, by unit and newest task name"""
+    dfs = budget.load_current_expenses()
+    long = pd.concat(
+        [
+            df[[UNIT, "Nazwa zadania", "Akronim"]].assign(**{facts.YEAR: year})
+            for year, df in dfs.items()
+        ],
+        ignore_index=True,
+    )
+    named = facts.task_names(long, facts.task_mapping(dfs))
+    texts: dict[tuple[str, str], set[str]] = {}
+    for unit, task, old, acronym in zip(
+        named[UNIT], named["Nazwa zadania"], long["Nazwa zadania"], long["Akronim"]
+    ):
+        text = texts.setdefault((str(unit), str(task)), set())
+        text.add(str(old))
+        if str(acronym).strip().lower() not in tasks.MISSING_ACRONYMS:
+            text.add(str(acronym))
+    return texts
+
+
+def _documents() -> list[tuple[Hit, str]]:
+    """Every searchable series with its text: tasks, units, district items, incomes/expenses"""
+    documents = []
+    dataset = "wydatki_biezace"
+    extra = _task_texts()
+    task_totals = cube.rollup(dataset, [UNIT, "Nazwa zadania"], cube.years(dataset))
+    for unit, task in task_totals[[UNIT, "Nazwa zadania"]].itertuples(index=False):
+        where = ((UNIT, unit), ("Nazwa zadania", task))
+        texts = " ".join(sorted(extra.get((unit, task), ())))
+        documents.append((Hit(TASK, task, unit, dataset, where), f"{task} {texts} {unit}"))
+    for unit in cube.members(dataset, UNIT):
+        documents.append((Hit(UNIT, unit, "", dataset, ((UNIT, unit),)), unit))
+    dataset = "districts"
+    items = cube.rollup(dataset, ["Rodzaj", "Wyszczególnienie"], cube.years(dataset))
+    for kind, item in items[["Rodzaj", "Wyszczególnienie"]].itertuples(index=False):
+        where = (("Rodzaj", kind), ("Wyszczególnienie", item))
+        documents.append((Hit(DISTRICT, item, kind, dataset, where), f"{item} {kind}"))
+    dataset = "doch_wyd"
+    total = facts.PARTS[0]
+    for table in ("dochody", "wydatki"):
+        for name in cube.members(dataset, "Nazwa", where={facts.TABLE: [table]}):
+            where = ((facts.TABLE, table), (facts.PART, total), ("Nazwa", name))
+            documents.append((Hit(table.capitalize(), name, total, dataset, where), name))
+    return documents
+
+
+@memoized
+def index() -> Index:
+    """Inverted index of all documents, rebuilt after a reload of any dataset"""
+    documents = _documents()
+    postings: dict[str, list[int]] = {}
+    for number, (_, text) in enumerate(documents):
+        for word in sorted(set(words(text))):
+            postings.setdefault(word, []).append(number)
+    terms = sorted(postings)
+    sizes = np.array([len(postings[term]) for term in terms], dtype=np.int64)
+    return Index(
+        hits=[hit for hit, _ in documents],
+        terms=np.array(terms, dtype=str),
+        offsets=np.concatenate([[0], np.cumsum(sizes)]),
+        postings=np.array([number for term in terms for number in postings[term]], dtype=np.int32),
+    )
+
+
+def _matches(idx: Index, word: str) -> tuple[np.ndarray, np.ndarray]:
+    """Documents with a word starting with `word` and those with exactly `word`"""
+    start, stop = np.searchsorted(idx.terms, [word, word + "\U0010ffff"])
+    documents = np.unique(idx.postings[idx.offsets[start]:idx.offsets[stop]])
+    if start < len(idx.terms) and idx.terms[start] == word:
+        return documents, idx.postings[idx.offsets[start]:idx.offsets[start + 1]]
+    return documents, idx.postings[:0]
+
+
+def search(query: str, limit: int = LIMIT) -> list[Hit]:
+    """Hits containing all query words as word prefixes, whole words ranked first"""
+    idx = index()
+    query_words = list(dict.fromkeys(words(query)))
+    if not query_words or not idx.hits:
+        return []
+    found, exact = None, []
+    for word in query_words:
+        documents, whole = _matches(idx, word)
+        found = documents if found is None else np.intersect1d(found, documents, assume_unique=True)
+        exact.append(whole)
+    score = sum(np.isin(found, whole).astype(np.int64) for whole in exact)
+    # whole words first, then shorter names, then tasks, units, district items, ...
+    ranked = sorted(
+        zip(found.tolist(), score.tolist()),
+        key=lambda item: (-item[1], len(idx.hits[item[0]].name), item[0]),
+    )
+    return [idx.hits[number] for number, _ in ranked[:limit]]
+
+
+def frame(query: str, limit: int = LIMIT) -> pd.DataFrame:
+    """Hits as a table: kind, name, context and dataset"""
+    return pd.DataFrame(
+        [hit[:4] for hit in search(query, limit)],
+        columns=["Rodzaj", "Nazwa", "Kontekst", "Zbiór"],
+    )
+
+
+@memoized
+def series_chart(hit: Hit) -> Chart:
+    """Totals of hit series in every budget year"""
+    years = cube.years(hit.dataset)
+    totals = cube.totals(hit.dataset, years, where={dim: [value] for dim, value in hit.where})
+    return Chart(x=years, series=totals_series(totals.values()), title=f"{hit.kind}: {hit.name}")
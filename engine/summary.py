@@ -0,0 +1,125 @@
+"""Main dashboard: budget summary of incomes, revenues, expenses and outgoings"""
+
+from typing import NamedTuple
+
+import pandas as pd
+
+from engine.cache import memoized
+from engine.common import EXPENSE_COLORS, INCOME_COLORS, Chart, delta_series, selected
+from loader import budget
+
+CREDIT_COLORS: dict[str, str] = {"color": "#F1D00A", "up": "#d90429", "down": "#588157"}
+
+
+class SummaryFilter(NamedTuple):
+    years: tuple[str, ...] = ()
+    SELECTIONS = ("years",)
+
+
+@memoized
+def years() -> list[str]:
+    """Budget years (YYYY) in ascending order"""
+    return sorted(list(budget.load_summary()["dochody"].columns)[1:])
+
+
+def selected_years(spec: SummaryFilter) -> list[str]:
+    return selected(years(), spec.years)
+
+
+@memoized
+def tables(spec: SummaryFilter) -> dict[str, pd.DataFrame]:
+    """Summary tables (dochody, przychody, wydatki, rozchody) of selected years"""
+    summary = budget.load_summary()
+    return {
+        name: summary[name].fillna(0)[["Nazwa", *selected_years(spec)]]
+        for name in budget.SUMMARY_NAMES
+    }
+
+
+def _rows(df: pd.DataFrame, years_list: list[str]) -> dict[str, list[float]]:
+    return {
+        name: [float(value) for value in values]
+        for name, values in zip(df["Nazwa"], df[years_list].to_numpy())
+    }
+
+
+@memoized
+def totals_chart(spec: SummaryFilter) -> Chart:
+    years_list = selected_years(spec)
+    dfs = tables(spec)
+    data_dochody = [float(dfs["dochody"][year].loc[0]) for year in years_list]
+    data_sum_przychody = [float(dfs["przychody"][year].sum()) for year in years_list]
+    data_wydatki = [float(dfs["wydatki"][year].loc[0]) for year in years_list]
+    data_sum_rozchody = [float(dfs["rozchody"][year].sum()) for year in years_list]
+    return Chart(
+        x=years_list,
+        series=delta_series(
+            ["Dochody i przychody", "Wydatki i rozchody"],
+            [
+                [sum(values) for values in zip(data_dochody, data_sum_przychody)],
+                [sum(values) for values in zip(data_wydatki, data_sum_rozchody)],
+            ],
+            [INCOME_COLORS, EXPENSE_COLORS],
+        ),
+        title="Zestawienie wszystkich przychodów i rozchodów",
+        legend=["Dochody i przychody", "Wydatki i rozchody"],
+    )
+
+
+@memoized
+def deficit_chart(spec: SummaryFilter) -> Chart:
+    years_list = selected_years(spec)
+    df_dochody = tables(spec)["dochody"]
+    return Chart(
+        x=years_list,
+        series=delta_series(
+            ["Deficyt"],
+            [[float(df_dochody[year].loc[1]) for year in years_list]],
+            [EXPENSE_COLORS],
+        ),
+        title="Historia deficytu budżetowego",
+    )
+
+
+@memoized
+def outgoings_chart(spec: SummaryFilter) -> Chart:
+    years_list = selected_years(spec)
+    rows = _rows(tables(spec)["rozchody"], years_list)
+    return Chart(
+        x=years_list,
+        series=delta_series(list(rows), list(rows.values()), [EXPENSE_COLORS] * len(rows)),
+        title="Historia rozchodów budżetowych",
+        legend=list(rows),
+    )
+
+
+@memoized
+def expenses_chart(spec: SummaryFilter) -> Chart:
+    years_list = selected_years(spec)
+    dfs = tables(spec)
+    return Chart(
+        x=years_list,
+        series=delta_series(
+            ["Wydatki"],
+            [[float(dfs["wydatki"][year].loc[0]) for year in years_list]],
+            [EXPENSE_COLORS],
+        ),
+        title="Historia wydatków budżetowych",
+        legend=list(dfs["rozchody"]["Nazwa"]),
+    )
+
+
+@memoized
+def revenues_chart(spec: SummaryFilter) -> Chart:
+    years_list = selected_years(spec)
+    rows = _rows(tables(spec)["przychody"], years_list)
+    return Chart(
+        x=years_list,
+        series=delta_series(
+            list(rows),
+            list(rows.values()),
+            [CREDIT_COLORS if name == "Kredyt" else INCOME_COLORS for name in rows],
+        ),
+        title="Historia przychodów budżetowych",
+        legend=list(rows),
+    )
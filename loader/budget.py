@@ -0,0 +1,236 @@
+"""Cached access to the budget CSV files shared by all app pages"""
+
+import os
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+
+# Loaded frames are shared between reruns and sessions, with copy-on-write any
+# derived frame or inplace operation copies the data instead of mutating cache.
+pd.set_option("mode.copy_on_write", True)
+
+# KRK_BUDGET_DATA points the app at another data tree (e.g. scaled benchmark data)
+DATA_PATH: Path = Path(
+    os.environ.get("KRK_BUDGET_DATA", Path(__file__).resolve().parents[1] / "data" / "budget")
+)
+CURRENT_EXPENSES_PATH: Path = DATA_PATH / "wydatki_biezace"
+DISTRICTS_PATH: Path = DATA_PATH / "districts"
+INCOMES_EXPENSES_PATH: Path = DATA_PATH / "doch_wyd"
+SUMMARY_NAMES: tuple[str, ...] = ("dochody", "przychody", "wydatki", "rozchody")
+# directories of the datasets, the summary files (dataset None) lie in DATA_PATH
+DATASETS: tuple[str, ...] = ("wydatki_biezace", "districts", "doch_wyd")
+
+Parser = Callable[..., Any]
+
+_cache: dict[tuple, tuple[int, Any]] = {}
+_lock = threading.Lock()
+_version = 0
+_version_all = 0
+_versions: dict[Optional[str], int] = {}
+_reads = threading.local()
+_hits = 0
+_misses = 0
+
+
+def cached(path: Path, parser: Parser = pd.read_csv, *args) -> Any:
+    """Parse file once per process, reparse only when its mtime changes"""
+    global _hits, _misses
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+    key = (str(path), parser.__name__, *args)
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] == mtime:
+            _hits += 1
+            return entry[1]
+        _misses += 1
+    df = parser(path, *args)
+    with _lock:
+        _cache[key] = (mtime, df)
+    return df
+
+
+def invalidate(path: Optional[Path] = None) -> None:
+    """Drop cached frames of given file or the whole cache"""
+    with _lock:
+        if path is None:
+            _cache.clear()
+            return
+        for key in [key for key in _cache if key[0] == str(Path(path))]:
+            del _cache[key]
+
+
+def stats() -> tuple[int, int, int]:
+    """Hits, misses and number of parsed files held by the cache"""
+    with _lock:
+        return _hits, _misses, len(_cache)
+
+
+class Frames(Mapping):
+    """Frames of one dataset keyed by budget date, each file is parsed on first access"""
+
+    def __init__(self, files: dict[str, tuple[Path, Parser, tuple]]) -> None:
+        self.files = files
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        path, parser, args = self.files[key]
+        return cached(path, parser, *args)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+
+def version() -> int:
+    """Data version, bumped whenever a reloaded source file replaced cached frames"""
+    return _version
+
+
+def versions(datasets: Iterable[Optional[str]]) -> tuple[int, ...]:
+    """Versions of datasets (None: summary files), bumped by their reloads"""
+    with _lock:
+        return tuple(_version_all + _versions.get(dataset, 0) for dataset in datasets)
+
+
+def bump(datasets: Optional[Iterable[Optional[str]]] = None) -> int:
+    """Mark datasets (all by default) and everything derived from them as outdated"""
+    global _version, _version_all
+    with _lock:
+        _version += 1
+        if datasets is None:
+            _version_all += 1
+        for dataset in datasets or ():
+            _versions[dataset] = _versions.get(dataset, 0) + 1
+        return _version
+
+
+def read(dataset: Optional[str]) -> None:
+    """Record that the computation running in this thread depends on dataset"""
+    reads = getattr(_reads, "datasets", None)
+    if reads is not None:
+        reads.add(dataset)
+
+
+@contextmanager
+def recording() -> Iterator[set[Optional[str]]]:
+    """Datasets read inside the block, also counted as reads of an enclosing block"""
+    outer = getattr(_reads, "datasets", None)
+    _reads.datasets = datasets = set()
+    try:
+        yield datasets
+    finally:
+        _reads.datasets = outer
+        if outer is not None:
+            outer.update(datasets)
+
+
+def csv_files(path: Path) -> list[Path]:
+    """CSV files of a dataset directory, sorted by name (budget year)"""
+    return [path / file for file in sorted(os.listdir(path)) if file.endswith(".csv")]
+
+
+def source_files(dataset: Optional[str]) -> list[Path]:
+    """Files dataset (None: summary files) is loaded from, the stored tasks mapping included"""
+    if dataset is None:
+        return [DATA_PATH / f"{name}.csv" for name in SUMMARY_NAMES]
+    from loader import tasks  # tasks matching builds on top of this module
+
+    files = csv_files(DATA_PATH / dataset)
+    if dataset == "wydatki_biezace" and tasks.TASKS_PATH.exists():
+        files.append(tasks.TASKS_PATH)
+    return files
+
+
+def sources_state(datasets: Iterable[Optional[str]] = (*DATASETS, None)) -> dict[str, int]:
+    """Modification time of every source file of datasets (all by default) by its data path"""
+    return {
+        str(file.relative_to(DATA_PATH)): file.stat().st_mtime_ns
+        for dataset in datasets
+        for file in source_files(dataset)
+    }
+
+
+def fresh_snapshot(use_snapshot: bool = True) -> Optional[ModuleType]:
+    """Snapshot module when its Parquet data is built from the current files, else None"""
+    if not use_snapshot:
+        return None
+    from loader import snapshot  # snapshot builds on top of this module
+
+    return snapshot if snapshot.is_fresh() else None
+
+
+def _parse_current_expenses(path: Path) -> pd.DataFrame:
+    from loader import stream  # stream imports pyarrow, load it only when parsing
+
+    return stream.read(path, stream.CURRENT_EXPENSES, strict=False)
+
+
+def _parse_districts(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df["Rodzaj"] = df["Rodzaj"].str.strip()
+    return df
+
+
+def load_current_expenses(use_snapshot: bool = True) -> Frames:
+    """Current expenses frames keyed by budget date (01_01_YYYY)"""
+    read("wydatki_biezace")
+    if snapshot := fresh_snapshot(use_snapshot):
+        return Frames({
+            f"01_01_{year}": (path, snapshot.read_part, ())
+            for year, path in snapshot.parts("wydatki_biezace").items()
+        })
+    return Frames({
+        file.name[11:21]: (file, _parse_current_expenses, ())
+        for file in csv_files(CURRENT_EXPENSES_PATH)
+    })
+
+
+def load_districts(use_snapshot: bool = True) -> Frames:
+    """Districts budget frames keyed by budget date (01.01.YYYY)"""
+    read("districts")
+    if snapshot := fresh_snapshot(use_snapshot):
+        return Frames({
+            f"01.01.{year}": (
+                path,
+                snapshot.read_part,
+                ((("Plan wydatków", f"Plan wydatków na 01.01.{year} r."),),),
+            )
+            for year, path in snapshot.parts("districts").items()
+        })
+    return Frames({
+        file.name[21:31].replace("_", "."): (file, _parse_districts, ())
+        for file in csv_files(DISTRICTS_PATH)
+    })
+
+
+def load_incomes_expenses(use_snapshot: bool = True) -> tuple[Frames, Frames]:
+    """Incomes and expenses frames keyed by budget year (YYYY)"""
+    read("doch_wyd")
+    if snapshot := fresh_snapshot(use_snapshot):
+        return tuple(
+            Frames({
+                str(year): (path, snapshot.read_part, ())
+                for year, path in snapshot.parts(kind).items()
+            })
+            for kind in ("dochody", "wydatki")
+        )
+    incomes, expenses = {}, {}
+    for file in csv_files(INCOMES_EXPENSES_PATH):
+        target = incomes if "Dochody" in file.name else expenses
+        target[file.name[8:12]] = (file, pd.read_csv, ())
+    return Frames(incomes), Frames(expenses)
+
+
+def load_summary(use_snapshot: bool = True) -> dict[str, pd.DataFrame]:
+    """Budget summary frames (dochody, przychody, wydatki, rozchody)"""
+    read(None)
+    if snapshot := fresh_snapshot(use_snapshot):
+        return snapshot.read_summary()
+    return {name: cached(DATA_PATH / f"{name}.csv") for name in SUMMARY_NAMES}
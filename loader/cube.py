@@ -0,0 +1,226 @@
+"""Materialized aggregate cube of the budget fact tables
+
+Every dataset is summed once over the hierarchy of its dimensions (ROLLUP).
+Level n of the cube is a ``Kwota`` series indexed by int32 codes of the first
+n dimensions and the year, sorted so that filters are answered by index
+lookups instead of a rescan of the fact table. Every level keeps the row
+ranges of each member of its first dimension (e.g. Jednostka), selecting
+members slices only their rows. Labels are decoded only in the
+results handed to the charts. The cube is written next to the Parquet snapshot
+by ``python -m loader.snapshot`` and built in memory when it is missing. With
+``KRK_BUDGET_BACKEND=sqlite`` the queries of datasets stored fresh in the
+database of ``loader.database`` run there as SQL instead.
+"""
+
+import os
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from loader import budget, facts, plane, snapshot
+from loader.facts import AMOUNT, YEAR
+
+CUBE_PATH: Path = snapshot.SNAPSHOT_PATH / "cube"
+BACKEND: str = os.environ.get("KRK_BUDGET_BACKEND", "cube")
+
+DIMENSIONS: dict[str, tuple[str, ...]] = {
+    "wydatki_biezace": ("Jednostka", "Nazwa zadania"),
+    "districts": ("Rodzaj", "Wyszczególnienie"),
+    "doch_wyd": (facts.TABLE, facts.PART, "Nazwa"),
+}
+FACTS: dict[str, Callable[[], facts.Facts]] = {
+    "wydatki_biezace": facts.current_expenses_long,
+    "districts": facts.districts_long,
+    "doch_wyd": facts.incomes_expenses_long,
+}
+
+Where = Optional[dict[str, Optional[Iterable]]]
+
+
+class Cube(NamedTuple):
+    levels: Sequence[pd.Series]
+    labels: dict[str, pd.Index]
+    # rows of code c of the first level dimension are offsets[c]:offsets[c + 1]
+    offsets: Sequence[Optional[np.ndarray]]
+
+    def decode(self, dim: str, codes: Iterable[int]) -> pd.Index:
+        return self.labels[dim].take(list(codes))
+
+    def codes(self, dim: str, values: Iterable) -> list[int]:
+        """Codes of labels in given order, unknown labels as -1"""
+        return self.labels[dim].get_indexer(pd.Index(list(values))).tolist()
+
+
+def _offsets(series: pd.Series) -> Optional[np.ndarray]:
+    """Row ranges of every code of the first dimension of a sorted cuboid"""
+    if series.index.names[0] == YEAR or series.empty:
+        return None
+    first = series.index.get_level_values(0).to_numpy()
+    return np.searchsorted(first, np.arange(first.max() + 2))
+
+
+def _rollup(fact: facts.Facts, dims: tuple[str, ...]) -> Cube:
+    levels = tuple(
+        fact.df.groupby([*dims[:level], YEAR], sort=True)[AMOUNT].sum()
+        for level in range(len(dims) + 1)
+    )
+    return Cube(levels, fact.labels, tuple(_offsets(series) for series in levels))
+
+
+def build(dataset: str) -> Cube:
+    """All roll-up levels of dataset, recomputed only when its facts change"""
+    fact = FACTS[dataset]()
+    return facts.memoized(
+        f"cube_{dataset}", {"facts": fact.df}, lambda: _rollup(fact, DIMENSIONS[dataset])
+    )
+
+
+def _cuboid_file(dataset: str, level: int) -> Path:
+    return CUBE_PATH / f"{dataset}-{level}.parquet"
+
+
+def _labels_file(dataset: str) -> Path:
+    return CUBE_PATH / f"{dataset}-labels.parquet"
+
+
+def write() -> None:
+    """Store the cube of every dataset and its dimension tables as Parquet files"""
+    CUBE_PATH.mkdir(parents=True, exist_ok=True)
+    for dataset in DIMENSIONS:
+        cube = build(dataset)
+        for level, series in enumerate(cube.levels):
+            series.reset_index().to_parquet(_cuboid_file(dataset, level), index=False)
+        pd.concat(
+            [
+                pd.DataFrame({"dim": dim, "label": labels.astype(str)})
+                for dim, labels in cube.labels.items()
+            ]
+        ).to_parquet(_labels_file(dataset), index=False)
+
+
+def _read_cuboid(path: Path) -> tuple[pd.Series, Optional[np.ndarray]]:
+    df = pd.read_parquet(path)
+    series = df.set_index(list(df.columns[:-1]))[AMOUNT]
+    return series, _offsets(series)
+
+
+def _read_labels(path: Path) -> dict[str, pd.Index]:
+    df = pd.read_parquet(path)
+    return {
+        dim: pd.Index(part["label"].to_numpy(dtype=object), name=dim)
+        for dim, part in df.groupby("dim", sort=False)
+    }
+
+
+class _Stored(Sequence):
+    """Series (part 0) or offsets (part 1) of stored cuboids, read on first use"""
+
+    def __init__(self, dataset: str, part: int) -> None:
+        self.dataset, self.part = dataset, part
+
+    def __len__(self) -> int:
+        return len(DIMENSIONS[self.dataset]) + 1
+
+    def __getitem__(self, level: int) -> Any:
+        return budget.cached(_cuboid_file(self.dataset, level), _read_cuboid)[self.part]
+
+
+def cuboids(dataset: str) -> Cube:
+    """Roll-up levels of dataset, read from the stored cube when it is fresh
+
+    Stored levels are read only when a query needs them, e.g. the list of years
+    reads just the dimension tables.
+    With ``KRK_BUDGET_PLANE`` set the levels are mapped from the published data
+    plane of ``loader.plane`` instead.
+    """
+    budget.read(dataset)
+    if plane.is_worker() and (published := plane.cuboids(dataset)) is not None:
+        return published
+    if budget.fresh_snapshot() and _labels_file(dataset).exists():
+        return Cube(
+            _Stored(dataset, 0),
+            budget.cached(_labels_file(dataset), _read_labels),
+            _Stored(dataset, 1),
+        )
+    return build(dataset)
+
+
+def _slice(cube: Cube, dataset: str, dims: Iterable[str], where: Where) -> pd.Series:
+    """Smallest roll-up level holding `dims` restricted to `where` members"""
+    where = {dim: values for dim, values in (where or {}).items() if values}
+    order = DIMENSIONS[dataset]
+    level = max((order.index(dim) + 1 for dim in {*dims, *where} if dim != YEAR), default=0)
+    series, offsets = cube.levels[level], cube.offsets[level]
+    first = series.index.names[0]
+    if offsets is not None and first in where:
+        # rows of the selected members only, in code order to keep the index sorted
+        codes = sorted(code for code in set(cube.codes(first, where.pop(first))) if code >= 0)
+        rows = [
+            np.arange(offsets[code], offsets[code + 1]) for code in codes if code + 1 < len(offsets)
+        ]
+        series = series.iloc[np.concatenate(rows) if rows else []]
+    for dim, values in where.items():
+        series = series[series.index.get_level_values(dim).isin(cube.codes(dim, values))]
+    return series
+
+
+def _database(dataset: str) -> Optional[ModuleType]:
+    """SQLite backend when selected and holding fresh dataset, None for the cube"""
+    if BACKEND != "sqlite":
+        return None
+    from loader import database  # optional backend, imported only when selected
+
+    budget.read(dataset)
+    return database if database.is_fresh(dataset) else None
+
+
+def years(dataset: str) -> list[str]:
+    """Budget years of dataset in ascending order"""
+    if database := _database(dataset):
+        return database.years(dataset)
+    return list(cuboids(dataset).labels[YEAR])
+
+
+def members(dataset: str, dim: str, where: Where = None) -> list:
+    """Members of dimension having any amount, in cube order, restricted to `where`"""
+    if database := _database(dataset):
+        return database.members(dataset, dim, where)
+    cube = cuboids(dataset)
+    series = _slice(cube, dataset, [dim], where)
+    return list(cube.decode(dim, series.index.get_level_values(dim).unique()))
+
+
+def totals(dataset: str, years: Iterable[str], where: Where = None) -> dict[str, float]:
+    """Grand total of every year restricted to `where` members, missing years as 0"""
+    if database := _database(dataset):
+        return database.totals(dataset, years, where)
+    years = list(years)
+    cube = cuboids(dataset)
+    series = _slice(cube, dataset, [], where)
+    sums = series.groupby(level=YEAR).sum().reindex(cube.codes(YEAR, years), fill_value=0)
+    return {year: float(value) for year, value in zip(years, sums)}
+
+
+def rollup(
+    dataset: str, by: Sequence[str], years: Iterable[str], where: Where = None
+) -> pd.DataFrame:
+    """Sums by `by` dimensions with one column per year, empty filters are ignored"""
+    if database := _database(dataset):
+        return database.rollup(dataset, by, years, where)
+    years = list(years)
+    cube = cuboids(dataset)
+    series = _slice(cube, dataset, by, {**(where or {}), YEAR: years})
+    if list(series.index.names) != [*by, YEAR]:
+        series = series.groupby(level=[*by, YEAR], sort=True).sum()
+    wide = series.unstack(YEAR, fill_value=0).reindex(
+        columns=cube.codes(YEAR, years), fill_value=0
+    )
+    wide.columns = years
+    if len(by) > 1:
+        wide = wide.sort_index()  # unstack keeps inner members in order of appearance
+    labels = [cube.decode(dim, wide.index.get_level_values(dim)) for dim in by]
+    wide.index = pd.MultiIndex.from_arrays(labels) if len(by) > 1 else labels[0]
+    return wide.reset_index()
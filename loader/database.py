@@ -0,0 +1,279 @@
+"""Optional SQLite query backend of the budget datasets
+
+``python -m loader.database build`` loads the budget data into
+``data/budget/budget.sqlite``. Every roll-up level of ``loader.cube`` becomes
+the precomputed summary table ``<dataset>_<level>`` with its label columns
+indexed. The deepest level holds the facts summed by all dimensions. The
+budget summary frames go to ``summary``. ``refresh`` rebuilds only datasets
+with changed source files.
+
+With ``KRK_BUDGET_BACKEND=sqlite`` the cube queries of the pages run here as
+parameterized SQL on a pool of read only connections shared by all sessions.
+A dataset whose files changed after the last build is answered by the
+in-memory cube until the database is refreshed.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+import pandas as pd
+
+from loader import budget
+from loader.facts import AMOUNT, YEAR
+
+DB_PATH: Path = budget.DATA_PATH / "budget.sqlite"
+POOL_SIZE: int = int(os.environ.get("KRK_BUDGET_DB_POOL", 4))
+SUMMARY: str = "summary"
+
+Where = Optional[dict[str, Optional[Iterable]]]
+
+_pool: queue.Queue = queue.Queue(maxsize=POOL_SIZE)
+_state: dict[int, dict[str, dict[str, int]]] = {}  # database mtime -> stored sources
+_lock = threading.Lock()
+
+
+def _budget_dataset(dataset: str) -> Optional[str]:
+    """Dataset name of loader.budget, None for the summary files"""
+    return None if dataset == SUMMARY else dataset
+
+
+def _datasets() -> tuple[str, ...]:
+    from loader import cube  # the cube imports this module to dispatch queries
+
+    return (*cube.DIMENSIONS, SUMMARY)
+
+
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    """Read only connection from the shared pool, reopened after a rebuild"""
+    stamp = DB_PATH.stat().st_mtime_ns
+    try:
+        conn, conn_stamp = _pool.get_nowait()
+        if conn_stamp != stamp:
+            conn.close()
+            raise queue.Empty
+    except queue.Empty:
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        yield conn
+    finally:
+        try:
+            _pool.put_nowait((conn, stamp))
+        except queue.Full:
+            conn.close()
+
+
+def _stored_state() -> dict[str, dict[str, int]]:
+    """Source files state of every dataset at its last build"""
+    stamp = DB_PATH.stat().st_mtime_ns
+    with _lock:
+        if stamp in _state:
+            return _state[stamp]
+    with connection() as conn:
+        rows = conn.execute("SELECT dataset, path, mtime_ns FROM sources").fetchall()
+    state: dict[str, dict[str, int]] = {}
+    for dataset, path, mtime_ns in rows:
+        state.setdefault(dataset, {})[path] = mtime_ns
+    with _lock:
+        _state.clear()
+        _state[stamp] = state
+    return state
+
+
+def is_fresh(dataset: str) -> bool:
+    """Whether the database holds dataset built from its current source files"""
+    try:
+        return _stored_state().get(dataset) == budget.sources_state([_budget_dataset(dataset)])
+    except (OSError, sqlite3.Error):
+        return False
+
+
+def _quoted(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _write_table(
+    conn: sqlite3.Connection, table: str, df: pd.DataFrame, keys: Sequence[str]
+) -> None:
+    """Replace table with frame, keys as primary key and every label column indexed"""
+    conn.execute(f"DROP TABLE IF EXISTS {_quoted(table)}")
+    columns = ", ".join(
+        f"{_quoted(column)} {'REAL' if column == AMOUNT else 'TEXT NOT NULL'}"
+        for column in df.columns
+    )
+    conn.execute(
+        f"CREATE TABLE {_quoted(table)} ({columns}, "
+        f"PRIMARY KEY ({', '.join(map(_quoted, keys))})) WITHOUT ROWID"
+    )
+    conn.executemany(
+        f"INSERT INTO {_quoted(table)} VALUES ({', '.join('?' * len(df.columns))})",
+        df.itertuples(index=False, name=None),
+    )
+    # the primary key already serves filters on its first column
+    for column in [column for column in df.columns if column != AMOUNT][1:]:
+        conn.execute(
+            f"CREATE INDEX {_quoted(f'{table}_{column}')} "
+            f"ON {_quoted(table)} ({_quoted(column)})"
+        )
+
+
+def _write_dataset(conn: sqlite3.Connection, dataset: str) -> None:
+    from loader import cube
+
+    if dataset == SUMMARY:
+        df = pd.concat(
+            [
+                frame.melt(id_vars="Nazwa", var_name=YEAR, value_name=AMOUNT).assign(Tabela=name)
+                for name, frame in budget.load_summary().items()
+            ]
+        )[["Tabela", "Nazwa", YEAR, AMOUNT]]
+        _write_table(conn, SUMMARY, df.astype({YEAR: str}), ["Tabela", "Nazwa", YEAR])
+    else:
+        built = cube.build(dataset)
+        for level, series in enumerate(built.levels):
+            df = series.reset_index()
+            for dim in series.index.names:
+                df[dim] = built.decode(dim, df[dim]).astype(str)
+            _write_table(conn, f"{dataset}_{level}", df, list(series.index.names))
+    conn.execute("DELETE FROM sources WHERE dataset = ?", (dataset,))
+    conn.executemany(
+        "INSERT INTO sources VALUES (?, ?, ?)",
+        [
+            (dataset, path, mtime_ns)
+            for path, mtime_ns in budget.sources_state([_budget_dataset(dataset)]).items()
+        ],
+    )
+
+
+def build(datasets: Optional[Iterable[str]] = None) -> list[str]:
+    """Write datasets (all by default) into a copy of the database and swap it in"""
+    datasets = list(_datasets() if datasets is None else datasets)
+    target = DB_PATH.with_name(DB_PATH.name + ".tmp")
+    target.unlink(missing_ok=True)
+    conn = sqlite3.connect(target)
+    try:
+        if DB_PATH.exists():
+            # untouched datasets are kept from the current database
+            source = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+            source.backup(conn)
+            source.close()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources "
+            "(dataset TEXT, path TEXT, mtime_ns INTEGER, PRIMARY KEY (dataset, path))"
+        )
+        with conn:
+            for dataset in datasets:
+                _write_dataset(conn, dataset)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(target, DB_PATH)
+    return datasets
+
+
+def refresh() -> list[str]:
+    """Rebuild the datasets whose source files changed since the last build"""
+    if not DB_PATH.exists():
+        return build()
+    stale = [dataset for dataset in _datasets() if not is_fresh(dataset)]
+    return build(stale) if stale else []
+
+
+def _level(dataset: str, dims: Iterable[str]) -> str:
+    """Smallest summary table of dataset holding all `dims`"""
+    from loader import cube
+
+    order = cube.DIMENSIONS[dataset]
+    level = max((order.index(dim) + 1 for dim in dims if dim != YEAR), default=0)
+    return _quoted(f"{dataset}_{level}")
+
+
+def _filters(*filters: Where) -> tuple[set[str], str, list]:
+    """Dimensions of non-empty filters, their SQL condition and its parameters"""
+    pairs = [
+        (dim, list(values)) for where in filters for dim, values in (where or {}).items() if values
+    ]
+    # one JSON array parameter per filter, any number of selected members
+    conditions = [f"{_quoted(dim)} IN (SELECT value FROM json_each(?))" for dim, _ in pairs]
+    params = [json.dumps([str(value) for value in values]) for _, values in pairs]
+    return {dim for dim, _ in pairs}, " AND ".join(conditions) or "1", params
+
+
+def _query(sql: str, params: Sequence) -> list[tuple]:
+    with connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def years(dataset: str) -> list[str]:
+    """Budget years of dataset in ascending order"""
+    sql = f"SELECT DISTINCT Rok FROM {_level(dataset, [])} ORDER BY Rok"
+    return [row[0] for row in _query(sql, ())]
+
+
+def members(dataset: str, dim: str, where: Where = None) -> list:
+    """Members of dimension having any amount, in cube order, restricted to `where`"""
+    from loader import cube
+
+    dims, condition, params = _filters(where)
+    column = _quoted(dim)
+    # cube order: by the first labels of the preceding dimensions, then by label
+    parents = cube.DIMENSIONS[dataset][:cube.DIMENSIONS[dataset].index(dim)]
+    first = " || char(1) || ".join(_quoted(parent) for parent in parents) or "''"
+    sql = (
+        f"SELECT {column} FROM {_level(dataset, [dim, *dims])} WHERE {condition} "
+        f"GROUP BY {column} ORDER BY MIN({first}), {column}"
+    )
+    return [row[0] for row in _query(sql, params)]
+
+
+def totals(dataset: str, years: Iterable[str], where: Where = None) -> dict[str, float]:
+    """Grand total of every year restricted to `where` members, missing years as 0"""
+    years = list(years)
+    dims, condition, params = _filters(where, {YEAR: years})
+    sql = f"SELECT Rok, SUM(Kwota) FROM {_level(dataset, dims)} WHERE {condition} GROUP BY Rok"
+    sums = dict(_query(sql, params))
+    return {year: float(sums.get(year, 0.0)) for year in years}
+
+
+def rollup(
+    dataset: str, by: Sequence[str], years: Iterable[str], where: Where = None
+) -> pd.DataFrame:
+    """Sums by `by` dimensions with one column per year, empty filters are ignored"""
+    years = list(years)
+    dims, condition, params = _filters({**(where or {}), YEAR: years})
+    columns = ", ".join(_quoted(dim) for dim in by)
+    sql = (
+        f"SELECT {columns}, Rok, SUM(Kwota) FROM {_level(dataset, [*by, *dims])} "
+        f"WHERE {condition} GROUP BY {columns}, Rok ORDER BY {columns}"
+    )
+    long = pd.DataFrame(_query(sql, params), columns=[*by, YEAR, AMOUNT])
+    wide = (
+        long.set_index([*by, YEAR])[AMOUNT]
+        .unstack(YEAR, fill_value=0)
+        .reindex(columns=years, fill_value=0)
+        .astype("float64")
+    )
+    wide.columns.name = None
+    return wide.reset_index()
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the SQLite query backend")
+    parser.add_argument(
+        "command", choices=("build", "refresh"), nargs="?", default="refresh",
+        help="rebuild everything or only datasets with changed files (default)",
+    )
+    options = parser.parse_args(args)
+    written = build() if options.command == "build" else refresh()
+    print(f"{', '.join(written) or 'No datasets'} written to {DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Long-format fact tables built once from the cached budget frames
+
+Label columns (year, unit, task, ...) are interned into dimension tables of
+sorted labels, fact frames carry only their int32 codes and float64 amounts.
+Code order is label order, so sorting or grouping by codes keeps labels sorted.
+"""
+
+import threading
+from typing import Any, Callable, NamedTuple, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from loader import budget, tasks
+
+YEAR: str = "Rok"
+AMOUNT: str = "Kwota"
+TABLE: str = "Tabela"
+PART: str = "Część"
+PARTS: tuple[str, ...] = ("Ogółem", "Gmina", "Powiat")
+
+T = TypeVar("T")
+
+
+class Facts(NamedTuple):
+    df: pd.DataFrame
+    labels: dict[str, pd.Index]
+
+
+_memo: dict[str, tuple[tuple[Any, ...], Any]] = {}
+_pieces: dict[str, dict[Any, tuple[pd.DataFrame, pd.DataFrame]]] = {}
+_lock = threading.Lock()
+
+
+def memoized(name: str, frames: dict[str, Any], build: Callable[[], T]) -> T:
+    """Result of build named `name`, rebuilt only when any of its source frames was reloaded
+
+    Tables derived from the facts (the cube, the classification tree) are
+    memoized here as well, keyed by the frames they are built from.
+    """
+    sources = tuple(frames.values())
+    with _lock:
+        entry = _memo.get(name)
+    if entry and len(entry[0]) == len(sources) and all(
+        a is b for a, b in zip(entry[0], sources)
+    ):
+        return entry[1]
+    built = build()
+    with _lock:
+        _memo[name] = (sources, built)
+    return built
+
+
+def _long(
+    name: str, frames: dict[Any, pd.DataFrame], melt: Callable[[Any, pd.DataFrame], pd.DataFrame]
+) -> pd.DataFrame:
+    """Concatenated long pieces of frames, only reloaded frames are melted again"""
+    with _lock:
+        previous = _pieces.get(name, {})
+    pieces = {
+        key: previous[key] if key in previous and previous[key][0] is df else (df, melt(key, df))
+        for key, df in frames.items()
+    }
+    with _lock:
+        _pieces[name] = pieces
+    return pd.concat([piece for _, piece in pieces.values()], ignore_index=True)
+
+
+def _interned(long: pd.DataFrame) -> Facts:
+    """Replace label columns of long table with int32 codes of sorted labels"""
+    dims = [column for column in long.columns if column != AMOUNT]
+    codes, labels = {}, {}
+    for dim in dims:
+        dim_codes, uniques = pd.factorize(long[dim], sort=True)
+        codes[dim] = dim_codes.astype(np.int32)
+        labels[dim] = pd.Index(uniques, name=dim)
+    df = pd.DataFrame({**codes, AMOUNT: long[AMOUNT].to_numpy(dtype=np.float64)})
+    # rows with missing labels are left out, as they would be by groupby
+    return Facts(df[(df[dims] >= 0).all(axis=1)].reset_index(drop=True), labels)
+
+
+def task_names(long: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
+    """Task names replaced by the newest name of the task matched across years"""
+    keys = pd.MultiIndex.from_frame(mapping[tasks.KEYS])
+    rows = keys.get_indexer(
+        pd.MultiIndex.from_arrays(
+            [long[YEAR].str[-4:], long["Jednostka"], long["Nazwa zadania"]]
+        )
+    )
+    names = np.where(rows >= 0, mapping["Zadanie"].to_numpy()[rows], long["Nazwa zadania"])
+    return long.assign(**{"Nazwa zadania": names})
+
+
+def task_mapping(dfs: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Stored tasks mapping, matched from the frames when it was not written yet"""
+    mapping = tasks.stored()
+    if mapping is None:
+        mapping = memoized("tasks", dfs, lambda: tasks.match(dfs))
+    return mapping
+
+
+def current_expenses_long() -> Facts:
+    """(Rok, Jednostka, Nazwa zadania, Kwota) facts of all current expenses years
+
+    Tasks renamed between years are reported under their newest name.
+    """
+    dfs = budget.load_current_expenses()
+    mapping = task_mapping(dfs)
+    return memoized(
+        "current_expenses",
+        {**dfs, "tasks": mapping},
+        lambda: _interned(task_names(
+            _long(
+                "current_expenses",
+                dfs,
+                lambda year, df: df[["Jednostka", "Nazwa zadania", "Wydatki na zadania ogółem"]]
+                .rename(columns={"Wydatki na zadania ogółem": AMOUNT})
+                .assign(**{YEAR: year}),
+            ),
+            mapping,
+        )[[YEAR, "Jednostka", "Nazwa zadania", AMOUNT]]),
+    )
+
+
+def districts_long() -> Facts:
+    """(Rok, Rodzaj, Wyszczególnienie, Kwota) facts of all districts budget years"""
+    dfs = budget.load_districts()
+    return memoized(
+        "districts",
+        dfs,
+        lambda: _interned(_long(
+            "districts",
+            dfs,
+            lambda year, df: df[["Rodzaj", "Wyszczególnienie", f"Plan wydatków na {year} r."]]
+            .rename(columns={f"Plan wydatków na {year} r.": AMOUNT})
+            .assign(**{YEAR: year}),
+        )[[YEAR, "Rodzaj", "Wyszczególnienie", AMOUNT]]),
+    )
+
+
+def incomes_expenses_long() -> Facts:
+    """(Rok, Tabela, Część, Nazwa, Kwota) facts of incomes and expenses by part"""
+    incomes, expenses = budget.load_incomes_expenses()
+    dfs = {
+        (table, year): df
+        for table, tables in (("dochody", incomes), ("wydatki", expenses))
+        for year, df in tables.items()
+    }
+    return memoized(
+        "incomes_expenses",
+        dfs,
+        lambda: _interned(_long(
+            "incomes_expenses",
+            dfs,
+            lambda key, df: df.melt(
+                id_vars="Nazwa", value_vars=PARTS, var_name=PART, value_name=AMOUNT
+            ).assign(**{YEAR: key[1], TABLE: key[0]}),
+        )[[YEAR, TABLE, PART, "Nazwa", AMOUNT]]),
+    )
@@ -0,0 +1,123 @@
+"""Budget classification tree of the districts budget: Dział → Rozdział
+
+Nodes are identified by their classification codes (``600`` Dział, ``60015``
+Rozdział), named by the newest budget (Rodzaj, Wyszczególnienie) and stored
+in preorder, so the subtree of a node is one slice of the node arrays. The
+sums of every node in every year are precomputed bottom-up once, drilling
+down a chart only cuts the visible part of the tree.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from loader import budget, facts
+
+ROOT: str = ""
+ROOT_NAME: str = "Dzielnice"
+DIVISION: str = "Dział "
+CHAPTER: str = "Rozdział"
+
+
+class Tree(NamedTuple):
+    ids: list[str]
+    names: list[str]
+    parents: np.ndarray  # position of the parent node, -1 for the root
+    depths: np.ndarray
+    # the subtree of node i is nodes i..ends[i] - 1
+    ends: np.ndarray
+    years: list[str]
+    sums: np.ndarray  # (nodes, years)
+
+    def position(self, node: str) -> int:
+        return self.ids.index(node)
+
+    def path(self, node: str) -> list[str]:
+        """Ids of the ancestors of node and of the node itself, from the root"""
+        positions = [self.position(node)]
+        while self.parents[positions[-1]] >= 0:
+            positions.append(int(self.parents[positions[-1]]))
+        return [self.ids[position] for position in reversed(positions)]
+
+    def subtree(self, node: str, depth: int, year: str) -> list[dict]:
+        """Nested ``name``/``value``/``children`` items of `depth` levels below node
+
+        Nodes without a positive amount in the year are left out.
+        """
+        start = self.position(node)
+        column = self.years.index(year)
+        values = self.sums[:, column].tolist()
+        bottom = self.depths[start] + depth
+        items: dict[int, list[dict]] = {start: []}
+        for position in range(start + 1, int(self.ends[start])):
+            parent = int(self.parents[position])
+            if self.depths[position] > bottom or values[position] <= 0 or parent not in items:
+                continue
+            item = {
+                "id": self.ids[position], "name": self.names[position], "value": values[position]
+            }
+            items[parent].append(item)
+            if self.depths[position] < bottom and self.ends[position] > position + 1:
+                item["children"] = items[position] = []
+        return items[start]
+
+
+def _long(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Codes, names and amounts of all years, in year order"""
+    years = sorted(frames, key=lambda label: label[-4:])
+    return pd.concat(
+        [
+            frames[year][[DIVISION, CHAPTER, "Rodzaj", "Wyszczególnienie"]].assign(
+                **{facts.YEAR: year, facts.AMOUNT: frames[year][f"Plan wydatków na {year} r."]}
+            )
+            for year in years
+        ],
+        ignore_index=True,
+    ).dropna(subset=[DIVISION, CHAPTER])
+
+
+def build(frames: dict[str, pd.DataFrame]) -> Tree:
+    """Tree of the classification codes of frames with sums of every node and year"""
+    years = sorted(frames, key=lambda label: label[-4:])
+    long = _long(frames).astype({DIVISION: np.int64, CHAPTER: np.int64})
+    # the newest budget names a code, rows are in year order
+    chapters = long.groupby(CHAPTER, sort=True)[[DIVISION, "Wyszczególnienie"]].last()
+    divisions = long.groupby(DIVISION, sort=True)["Rodzaj"].last()
+    ids, names, parents, depths = [ROOT], [ROOT_NAME], [-1], [0]
+    for division, name in divisions.items():
+        parent = len(ids)
+        nodes = [(str(division), str(name), 0, 1)] + [
+            (str(chapter), str(chapter_name).strip(), parent, 2)
+            for chapter, chapter_name in chapters.loc[
+                chapters[DIVISION] == division, "Wyszczególnienie"
+            ].items()
+        ]
+        for node, node_name, node_parent, depth in nodes:
+            ids.append(node)
+            names.append(node_name)
+            parents.append(node_parent)
+            depths.append(depth)
+    parents_array, depths_array = np.array(parents), np.array(depths)
+    chapter_rows = np.flatnonzero(depths_array == 2)
+    sums = np.zeros((len(ids), len(years)))
+    sums[chapter_rows] = (
+        long.pivot_table(index=CHAPTER, columns=facts.YEAR, values=facts.AMOUNT, aggfunc="sum")
+        .reindex(index=[int(ids[row]) for row in chapter_rows], columns=years)
+        .fillna(0.0)
+        .to_numpy()
+    )
+    for depth in range(int(depths_array.max()), 0, -1):
+        rows = np.flatnonzero(depths_array == depth)
+        np.add.at(sums, parents_array[rows], sums[rows])
+    ends = np.arange(1, len(ids) + 1)
+    for position in range(len(ids) - 1, 0, -1):
+        parent = parents_array[position]
+        ends[parent] = max(ends[parent], ends[position])
+    return Tree(ids, names, parents_array, depths_array, ends, years, sums)
+
+
+def districts() -> Tree:
+    """Classification tree of the districts budget, rebuilt only when its frames change"""
+    dfs = budget.load_districts()
+    return facts.memoized("tree_districts", dfs, lambda: build(dfs))
@@ -0,0 +1,392 @@
+"""Ingestion of the official XLSX budget attachments into canonical CSV tables
+
+Run it with ``python -m loader.ingest``. Workbooks from ``data/budget/<year>``
+are parsed in a process pool, results are cached per workbook content hash
+so only new or changed attachments are parsed again. Canonical CSV files are
+written only for years that do not have one yet. ``--overwrite`` replaces the
+existing files whose rows the parsed tables keep. New files trigger matching
+of tasks across years (``loader.tasks``) and a rebuild of the Parquet
+snapshot and its aggregate cube (and of the SQLite database of
+``loader.database`` when there is one).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from loader import budget, snapshot, stream, tasks
+
+CACHE_PATH: Path = budget.DATA_PATH / ".ingest"
+MANIFEST_PATH: Path = CACHE_PATH / "manifest.json"
+# bumped with parser changes, results cached by older parsers are parsed again
+PARSER_VERSION: int = 3
+
+
+class ParsedTable(NamedTuple):
+    kind: str
+    year: int
+    df: pd.DataFrame
+
+
+class Ingested(NamedTuple):
+    tables: dict[tuple[str, int], pd.DataFrame]
+    skipped: dict[Path, str]  # workbook -> reason it yielded no tables
+
+
+def _rows(path: Path, sheet: Optional[str] = None) -> Iterator[tuple]:
+    """Stream sheet rows (first sheet by default) in openpyxl read-only mode"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else " ".join(str(value).split())
+
+
+def _label(value: Any) -> str:
+    """Cell text as the canonical tables keep it, spacing included"""
+    return "" if value is None else str(value)
+
+
+def _number(value: Any) -> float:
+    if value is None or isinstance(value, (int, float)):
+        return np.nan if value is None else float(value)
+    try:
+        return float(str(value).replace(" ", "").replace(",", "."))
+    except ValueError:
+        return np.nan
+
+
+def _code(value: Any, digits: int) -> Optional[str]:
+    """Budget classification code (Dział has 3 digits, Rozdział 5) or None"""
+    if isinstance(value, (int, float)):
+        value = str(int(value)).zfill(digits)
+    text = _text(value)
+    return text if re.fullmatch(rf"\d{{{digits}}}", text) else None
+
+
+def _plan_years(row: tuple, pattern: str) -> dict[int, int]:
+    """Column index -> budget year of cells matching `pattern` with year group"""
+    years = {}
+    for idx, cell in enumerate(row):
+        if match := re.search(pattern, _text(cell)):
+            years[idx] = int(match.group(1))
+    return years
+
+
+def _plan_header(rows: Iterator[tuple]) -> dict[int, int]:
+    """Plan columns of the first header row with budget years, rows advance past it"""
+    plan_cols = {}
+    for row in rows:
+        if plan_cols := _plan_years(row, r"Plan wydatków na 01\.01\.(\d{4})"):
+            break
+    if not plan_cols:
+        raise ValueError("no 'Plan wydatków na 01.01.YYYY' header row")
+    return plan_cols
+
+
+def parse_current_expenses(path: Path) -> list[ParsedTable]:
+    """Tabela nr 5, current expenses of units and their tasks"""
+    rows = _rows(path)
+    # year label sits over the middle column of its 3 columns block
+    plan_cols = _plan_header(rows)
+    records = {year: [] for year in plan_cols.values()}
+    unit = None
+    for row in rows:
+        name, acronym = _text(row[0]), _text(row[1])
+        if acronym == "suma" or (
+            unit and not acronym and name != "Wydatki bieżące" and "wydatki bieżące" in name.lower()
+        ):
+            break
+        if acronym == "ogółem":
+            unit = _label(row[0])
+            continue
+        if unit is None or name in ("Wydatki bieżące", "Wydatki majątkowe"):
+            continue
+        # blank rows between units, "w tym" notes and staff rows stay as in the canonical tables
+        task, code = _label(row[0]) or np.nan, _label(row[1]) or np.nan
+        for col, year in plan_cols.items():
+            amounts = (_number(row[col + idx]) for idx in (-1, 0, 1))
+            records[year].append((unit, task, code, *amounts))
+    # except the blank rows closing the last unit
+    for data in records.values():
+        while data and pd.isna(data[-1][1]):
+            data.pop()
+    columns = [
+        "Jednostka",
+        "Nazwa zadania",
+        "Akronim",
+        "Wydatki rzeczowe",
+        "Wydatki na utrzymanie stanowiska pracy",
+        "Wydatki na zadania ogółem",
+    ]
+    return [
+        ParsedTable("wydatki_biezace", year, pd.DataFrame(data, columns=columns))
+        for year, data in records.items()
+    ]
+
+
+def parse_districts(path: Path) -> list[ParsedTable]:
+    """Tabela nr 6, budget of districts by Dział and Rozdział"""
+    rows = _rows(path)
+    plan_cols = _plan_header(rows)
+    records = {year: [] for year in plan_cols.values()}
+    section, kind = None, None
+    # the canonical tables carry the amount above a blank cell down to it
+    last = dict.fromkeys(plan_cols, 0.0)
+    for row in rows:
+        if _text(row[2]) == "Ogółem":
+            break
+        for col in plan_cols:
+            if not np.isnan(value := _number(row[col])):
+                last[col] = value
+        if code := _code(row[0], 3):
+            section, kind = float(code), _label(row[2])
+        elif (code := _code(row[1], 5)) and section is not None:
+            for col, year in plan_cols.items():
+                records[year].append((section, float(code), _label(row[2]), last[col], kind))
+    return [
+        ParsedTable(
+            "districts",
+            year,
+            pd.DataFrame(
+                data,
+                columns=[
+                    "Dział ",
+                    "Rozdział",
+                    "Wyszczególnienie",
+                    f"Plan wydatków na 01.01.{year} r.",
+                    "Rodzaj",
+                ],
+            ),
+        )
+        for year, data in records.items()
+    ]
+
+
+def _parse_sections(path: Path, kind: str, both_parts: bool = False) -> list[ParsedTable]:
+    """Załącznik nr 1/2, incomes/expenses by Dział split into Gmina and Powiat
+
+    Rows without any amount are dropped, with `both_parts` also rows without
+    an amount of the Gmina or of the Powiat.
+    """
+    rows = _rows(path)
+    year = int(path.parent.name)
+    name_col = total_col = None
+    for row in rows:
+        texts = [_text(cell) for cell in row]
+        for text in texts:
+            if match := re.search(r"Plan (?:dochodów|wydatków) na rok (\d{4})", text):
+                year = int(match.group(1))
+        if "Nazwa" in texts and "Ogółem" in texts:
+            name_col, total_col = texts.index("Nazwa"), texts.index("Ogółem")
+            break
+    if name_col is None:
+        raise ValueError("no summary by Dział table (header with Nazwa and Ogółem)")
+    records = []
+    for row in rows:
+        name = _text(row[name_col])
+        if not _code(row[0], 3) or not name or name[0] == "#" or name.replace(" ", "").isdigit():
+            continue
+        values = [_number(row[total_col + idx]) for idx in range(3)]
+        if np.nansum(values) and not (both_parts and not all(np.nan_to_num(values[1:]))):
+            records.append((_label(row[name_col]), *values))
+    df = pd.DataFrame(records, columns=["Nazwa", "Ogółem", "Gmina", "Powiat"])
+    return [ParsedTable(kind, year, df)]
+
+
+def parse_incomes(path: Path) -> list[ParsedTable]:
+    # the canonical incomes tables list the Działy with incomes of both parts
+    return _parse_sections(path, "dochody", both_parts=True)
+
+
+def parse_expenses(path: Path) -> list[ParsedTable]:
+    return _parse_sections(path, "wydatki")
+
+
+PARSERS: dict[str, Callable[[Path], list[ParsedTable]]] = {
+    "Tabela_nr_5": parse_current_expenses,
+    "Tabela_nr_6": parse_districts,
+    "Zal_nr_1": parse_incomes,
+    "Zal_nr_2": parse_expenses,
+}
+
+CANONICAL_FILES: dict[str, Callable[[int], Path]] = {
+    "wydatki_biezace": lambda year: budget.CURRENT_EXPENSES_PATH
+    / f"krk_budzet_01_01_{year}_wydatki_biezace.csv",
+    "districts": lambda year: budget.DISTRICTS_PATH / f"krk_pln_dla_dzielnic_01_01_{year}.csv",
+    "dochody": lambda year: budget.INCOMES_EXPENSES_PATH / f"Dochody_{year}.csv",
+    "wydatki": lambda year: budget.INCOMES_EXPENSES_PATH / f"Wydatki_{year}.csv",
+}
+# columns naming the rows of canonical tables, the others hold amounts
+LABELS: dict[str, list[str]] = {
+    "wydatki_biezace": ["Jednostka", "Nazwa zadania", "Akronim"],
+    "districts": ["Dział ", "Rozdział", "Wyszczególnienie", "Rodzaj"],
+    "dochody": ["Nazwa"],
+    "wydatki": ["Nazwa"],
+}
+
+
+def workbooks() -> list[Path]:
+    """Supported attachments of every budget year catalog"""
+    return [
+        path
+        for year_path in sorted(budget.DATA_PATH.glob("[0-9][0-9][0-9][0-9]"))
+        for path in sorted(year_path.glob("*.xlsx"))
+        if path.stem in PARSERS
+    ]
+
+
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _parse(path: Path) -> list[ParsedTable]:
+    """Tables of workbook, an error when none of them has any row"""
+    tables = PARSERS[path.stem](path)
+    if all(table.df.empty for table in tables):
+        raise ValueError("no rows parsed")
+    return tables
+
+
+def _cache_file(digest: str) -> Path:
+    return CACHE_PATH / f"{digest}-v{PARSER_VERSION}.pkl"
+
+
+def ingest(workers: Optional[int] = None, force: bool = False) -> Ingested:
+    """Parse changed workbooks, canonical tables keyed by (kind, year) and skipped files"""
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    paths = workbooks()
+    digests = {path: _digest(path) for path in paths}
+    stale = [
+        path
+        for path in paths
+        if force
+        or manifest.get(str(path.relative_to(budget.DATA_PATH))) != digests[path]
+        or not _cache_file(digests[path]).exists()
+    ]
+    failed: dict[Path, str] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {path: executor.submit(_parse, path) for path in stale}
+        for path, future in futures.items():
+            name = path.relative_to(budget.DATA_PATH)
+            try:
+                pd.to_pickle(future.result(), _cache_file(digests[path]))
+            except Exception as error:  # malformed workbooks must not stop the run
+                failed[path] = f"{type(error).__name__}: {error}"
+                print(f"Skipped {name}: {failed[path]}", file=sys.stderr)
+                continue
+            print(f"Parsed {name}")
+    parsed = [path for path in paths if path not in failed]
+    manifest = {str(path.relative_to(budget.DATA_PATH)): digests[path] for path in parsed}
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2))
+
+    tables: dict[tuple[str, int], pd.DataFrame] = {}
+    # attachments of the year's own budget win over previous year comparisons
+    for path in sorted(parsed, key=lambda path: path.parent.name):
+        for kind, year, df in pd.read_pickle(_cache_file(digests[path])):
+            if (kind, year) not in tables or int(path.parent.name) <= year:
+                tables[(kind, year)] = df
+    return Ingested(tables, failed)
+
+
+def _as_written(df: pd.DataFrame) -> pd.DataFrame:
+    """Table as read back from its canonical CSV file"""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)))
+
+
+def _same_rows(kind: str, df: pd.DataFrame, path: Path) -> bool:
+    """Whether table has the rows of the canonical file in its order, amounts aside"""
+    existing, new = pd.read_csv(path), _as_written(df)
+    return list(existing.columns) == list(new.columns) and existing[LABELS[kind]].equals(
+        new[LABELS[kind]]
+    )
+
+
+def write(tables: dict[tuple[str, int], pd.DataFrame], overwrite: bool = False) -> list[Path]:
+    """Write canonical CSV files, by default only for missing years
+
+    With `overwrite` an existing file is replaced only when the parsed table
+    has the same rows, the amounts of a year are updated but its rows are
+    never swapped for those of another attachment (e.g. the previous year
+    comparison in the next budget).
+    """
+    written = []
+    for (kind, year), df in sorted(tables.items()):
+        path = CANONICAL_FILES[kind](year)
+        if path.exists() and not overwrite:
+            continue
+        if path.exists() and not _same_rows(kind, df, path):
+            print(
+                f"Kept {path.relative_to(budget.DATA_PATH)}: its rows differ from the parsed "
+                "table, remove the file to replace it",
+                file=sys.stderr,
+            )
+            continue
+        df.to_csv(path, index=False)
+        budget.invalidate(path)
+        written.append(path)
+    return written
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None, help="parser processes")
+    parser.add_argument("--force", action="store_true", help="parse unchanged workbooks too")
+    parser.add_argument(
+        "--overwrite", action="store_true", help="replace existing canonical CSV files"
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="exit with an error when a workbook is skipped"
+    )
+    options = parser.parse_args(args)
+    tables, skipped = ingest(workers=options.workers, force=options.force)
+    written = write(tables, overwrite=options.overwrite)
+    for path in written:
+        print(f"Written {path.relative_to(budget.DATA_PATH)}")
+    failed = False
+    if written:
+        tasks.write()
+        try:
+            snapshot.build()
+            print(f"Snapshot and aggregate cube rebuilt in {snapshot.SNAPSHOT_PATH}")
+        except stream.SchemaError as error:
+            failed = True
+            print(f"Snapshot not rebuilt, the app reads the CSV files\n{error}", file=sys.stderr)
+        from loader import database  # optional backend, refreshed only when it is used
+
+        if database.DB_PATH.exists():
+            print(f"{', '.join(database.refresh())} refreshed in {database.DB_PATH}")
+    if skipped:
+        names = "\n".join(
+            f"  {path.relative_to(budget.DATA_PATH)}: {reason}" for path, reason in skipped.items()
+        )
+        print(
+            f"{len(skipped)} workbooks skipped, their tables were not updated:\n{names}",
+            file=sys.stderr,
+        )
+        failed = failed or options.strict
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
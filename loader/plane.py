@@ -0,0 +1,250 @@
+"""Memory-mapped data plane of the aggregate cube shared by server processes
+
+With several Streamlit processes behind a load balancer every process would
+parse the budget files and hold its own cube. Set ``KRK_BUDGET_PLANE`` to a
+file path (e.g. on ``/dev/shm``) and run one publisher:
+
+    python -m loader.plane [--watch]
+
+It writes the label code arrays, amounts and row offsets of every cube level
+with the dictionary tables of labels into that file. The server processes map
+the file read only and build their cube series over it without copying, so
+the pages of all processes share one copy of the data in the page cache.
+
+The file starts with a versioned header and a JSON table of contents. A new
+version is written next to the file and swapped in atomically. Processes
+notice the swap on their next query and switch to it, and only results of
+datasets that changed are recomputed. With ``--watch`` the publisher
+republishes after every hot reload. The server processes then do not watch
+the files themselves.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from loader import budget
+
+PLANE_PATH: Path = Path(os.environ.get("KRK_BUDGET_PLANE") or budget.DATA_PATH / "budget.plane")
+ENABLED: bool = bool(os.environ.get("KRK_BUDGET_PLANE"))
+MAGIC: bytes = b"KRKPLANE"
+ALIGN: int = 64
+
+# magic, plane version, length of the JSON table of contents
+_HEADER = struct.Struct("<8sQQ")
+
+
+class Plane(NamedTuple):
+    stamp: tuple[int, int]
+    version: int
+    digests: dict[str, str]
+    cubes: dict[str, Any]
+
+
+_plane: Optional[Plane] = None
+_publishing = False
+_lock = threading.Lock()
+
+
+def _code_dtype(size: int) -> np.dtype:
+    """Smallest code dtype pandas keeps without copying for `size` labels"""
+    for dtype in (np.int8, np.int16):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int32)
+
+
+def _digest(dataset: str) -> str:
+    """Digest of the state of dataset source files the published cube was built from"""
+    state = json.dumps(budget.sources_state([dataset]), sort_keys=True)
+    return hashlib.blake2b(state.encode(), digest_size=16).hexdigest()
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.blobs: list[bytes] = []
+        self.size = 0
+
+    def add(self, array: np.ndarray) -> dict:
+        """Append array aligned to `ALIGN` bytes, its location relative to the data"""
+        offset = -self.size % ALIGN + self.size
+        self.blobs.append(b"\0" * (offset - self.size))
+        data = np.ascontiguousarray(array).tobytes()
+        self.blobs.append(data)
+        self.size = offset + len(data)
+        return {"offset": offset, "dtype": array.dtype.str, "length": len(array)}
+
+
+def publish() -> int:
+    """Write the cube of every dataset into a new plane version and swap it in"""
+    from loader import cube
+
+    current = _read_header(PLANE_PATH)
+    version = current[0] + 1 if current else 1
+    writer = _Writer()
+    datasets = {}
+    for dataset in cube.DIMENSIONS:
+        digest = _digest(dataset)
+        built = cube.build(dataset)
+        levels = []
+        for series, offsets in zip(built.levels, built.offsets):
+            index = series.index
+            names = list(index.names)
+            codes = [
+                writer.add(
+                    index.get_level_values(name).to_numpy().astype(
+                        _code_dtype(len(built.labels[name])) if len(names) > 1 else np.int32
+                    )
+                )
+                for name in names
+            ]
+            levels.append({
+                "names": names,
+                "codes": codes,
+                "amount": writer.add(series.to_numpy(dtype=np.float64)),
+                "offsets": None if offsets is None else writer.add(offsets.astype(np.int64)),
+            })
+        datasets[dataset] = {
+            "digest": digest,
+            "labels": {dim: [str(label) for label in labels] for dim, labels in built.labels.items()},
+            "levels": levels,
+        }
+    toc = json.dumps({"datasets": datasets}, ensure_ascii=False).encode()
+    start = -(_HEADER.size + len(toc)) % ALIGN + _HEADER.size + len(toc)
+    target = PLANE_PATH.with_name(PLANE_PATH.name + ".tmp")
+    with open(target, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, version, len(toc)))
+        file.write(toc)
+        file.write(b"\0" * (start - _HEADER.size - len(toc)))
+        for blob in writer.blobs:
+            file.write(blob)
+        file.flush()
+        os.fsync(file.fileno())
+    # attached processes keep the old file mapped until they switch
+    os.replace(target, PLANE_PATH)
+    return version
+
+
+def _read_header(path: Path) -> Optional[tuple[int, int]]:
+    """Version and table of contents length of plane file, None when missing"""
+    try:
+        with open(path, "rb") as file:
+            magic, version, toc_length = _HEADER.unpack(file.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return (version, toc_length) if magic == MAGIC else None
+
+
+def _array(data: np.ndarray, location: dict) -> np.ndarray:
+    return np.frombuffer(
+        data, np.dtype(location["dtype"]), location["length"], location["offset"]
+    )
+
+
+def _cube(data: np.ndarray, entry: dict) -> Any:
+    """Cube of dataset with series over the mapped arrays, only labels are copied"""
+    from loader import cube
+
+    labels = {
+        dim: pd.Index(np.array(values, dtype=object), name=dim)
+        for dim, values in entry["labels"].items()
+    }
+    levels, offsets = [], []
+    for level in entry["levels"]:
+        names = level["names"]
+        codes = [_array(data, location) for location in level["codes"]]
+        if len(names) == 1:
+            index = pd.Index(codes[0], name=names[0], copy=False)
+        else:
+            index = pd.MultiIndex(
+                levels=[np.arange(len(labels[name]), dtype=np.int32) for name in names],
+                codes=codes,
+                names=names,
+                verify_integrity=False,
+            )
+        levels.append(pd.Series(_array(data, level["amount"]), index=index, name=cube.AMOUNT, copy=False))
+        offsets.append(None if level["offsets"] is None else _array(data, level["offsets"]))
+    return cube.Cube(tuple(levels), labels, tuple(offsets))
+
+
+def _attach(stamp: tuple[int, int]) -> Optional[Plane]:
+    header = _read_header(PLANE_PATH)
+    if header is None:
+        return None
+    version, toc_length = header
+    mapped = np.memmap(PLANE_PATH, mode="r")
+    toc = json.loads(bytes(mapped[_HEADER.size:_HEADER.size + toc_length]).decode())
+    start = -(_HEADER.size + toc_length) % ALIGN + _HEADER.size + toc_length
+    data = mapped[start:]
+    datasets = toc["datasets"]
+    return Plane(
+        stamp,
+        version,
+        {dataset: entry["digest"] for dataset, entry in datasets.items()},
+        {dataset: _cube(data, entry) for dataset, entry in datasets.items()},
+    )
+
+
+def cuboids(dataset: str) -> Optional[Any]:
+    """Cube of dataset from the current plane version, None when nothing is published"""
+    global _plane
+    try:
+        stat = os.stat(PLANE_PATH)
+    except OSError:
+        return None
+    stamp = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if _plane is None or _plane.stamp != stamp:
+            previous, _plane = _plane, _attach(stamp)
+            if previous is not None and _plane is not None:
+                changed = [
+                    name for name, digest in _plane.digests.items()
+                    if previous.digests.get(name) != digest
+                ]
+                if changed:
+                    budget.bump(changed)
+        plane = _plane
+    return plane.cubes.get(dataset) if plane else None
+
+
+def is_worker() -> bool:
+    """Whether this process reads the published plane instead of the budget files"""
+    return ENABLED and not _publishing
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    global _publishing
+    parser = argparse.ArgumentParser(description="Publish the cube data plane")
+    parser.add_argument("--watch", action="store_true", help="republish after every reload")
+    options = parser.parse_args(args)
+    _publishing = True
+    print(f"Plane version {publish()} published to {PLANE_PATH}")
+    if not options.watch:
+        return
+    from loader import watch
+
+    def republish(version: int, paths: list[Path]) -> None:
+        print(f"Plane version {publish()} published after reload of data version {version}")
+
+    watch.start(republish)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watch.stop()
+
+
+if __name__ == "__main__":
+    # run main of the module imported by cube and watch, it holds the publisher flag
+    from loader import plane
+
+    plane.main()
@@ -0,0 +1,176 @@
+"""Columnar Parquet snapshot of the budget data
+
+Build it with ``python -m loader.snapshot``, the dataset is written to
+``data/budget/snapshot`` partitioned as ``kind=<kind>/year=<year>`` together
+with the aggregate cube of ``loader.cube``.
+"""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from loader import budget, stream
+
+SNAPSHOT_PATH: Path = budget.DATA_PATH / "snapshot"
+MANIFEST_PATH: Path = SNAPSHOT_PATH / "manifest.json"
+
+_label = pa.dictionary(pa.int32(), pa.string())
+SCHEMAS: dict[str, pa.Schema] = {
+    "wydatki_biezace": pa.schema([
+        ("Jednostka", _label),
+        ("Nazwa zadania", _label),
+        ("Akronim", pa.string()),
+        ("Wydatki rzeczowe", pa.float64()),
+        ("Wydatki na utrzymanie stanowiska pracy", pa.float64()),
+        ("Wydatki na zadania ogółem", pa.float64()),
+    ]),
+    "districts": pa.schema([
+        ("Dział ", pa.float64()),
+        ("Rozdział", pa.float64()),
+        ("Wyszczególnienie", _label),
+        ("Plan wydatków", pa.float64()),
+        ("Rodzaj", _label),
+    ]),
+    "dochody": pa.schema([
+        ("Nazwa", _label),
+        ("Ogółem", pa.float64()),
+        ("Gmina", pa.float64()),
+        ("Powiat", pa.float64()),
+    ]),
+    "summary": pa.schema([
+        ("Tabela", _label),
+        ("Nazwa", _label),
+        ("Kwota", pa.float64()),
+    ]),
+}
+SCHEMAS["wydatki"] = SCHEMAS["dochody"]
+
+
+def _part_file(kind: str, year: int) -> Path:
+    part_path = SNAPSHOT_PATH / f"kind={kind}" / f"year={year}"
+    part_path.mkdir(parents=True, exist_ok=True)
+    return part_path / "part-0.parquet"
+
+
+def _write_part(kind: str, year: int, df: pd.DataFrame) -> None:
+    table = pa.Table.from_pandas(df, schema=SCHEMAS[kind], preserve_index=False)
+    pq.write_table(table, _part_file(kind, year))
+
+
+def _summary_by_year() -> dict[int, pd.DataFrame]:
+    long = pd.concat(
+        [
+            df.melt(id_vars="Nazwa", var_name="year", value_name="Kwota").assign(Tabela=name)
+            for name, df in budget.load_summary().items()
+        ]
+    )
+    return {
+        int(year): df[["Tabela", "Nazwa", "Kwota"]]
+        for year, df in long.groupby("year", sort=True)
+    }
+
+
+def build() -> None:
+    """Compile all budget CSV files into the Parquet snapshot
+
+    A current expenses file with invalid values raises ``stream.SchemaError``
+    before the manifest is written, the loader keeps reading the CSV files.
+    """
+    state = budget.sources_state()
+    budget.invalidate()
+    shutil.rmtree(SNAPSHOT_PATH, ignore_errors=True)
+    # current expenses are streamed chunk by chunk, the files can outgrow memory
+    for file in budget.csv_files(budget.CURRENT_EXPENSES_PATH):
+        target = _part_file("wydatki_biezace", int(file.name[17:21]))
+        errors = stream.to_parquet(
+            file, stream.CURRENT_EXPENSES, target, SCHEMAS["wydatki_biezace"]
+        )
+        if errors:
+            raise stream.SchemaError(file, errors)
+    for label, df in budget.load_districts(use_snapshot=False).items():
+        df = df.rename(columns={f"Plan wydatków na {label} r.": "Plan wydatków"})
+        _write_part("districts", int(label[-4:]), df)
+    incomes, expenses = budget.load_incomes_expenses(use_snapshot=False)
+    for kind, dfs in (("dochody", incomes), ("wydatki", expenses)):
+        for label, df in dfs.items():
+            _write_part(kind, int(label), df)
+    for year, df in _summary_by_year().items():
+        _write_part("summary", year, df)
+    from loader import cube  # cube is stored inside the snapshot
+
+    cube.write()
+    MANIFEST_PATH.write_text(json.dumps({"sources": state}, indent=2))
+
+
+def is_fresh() -> bool:
+    """Whether snapshot exists and was built from the current source files"""
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+        return manifest["sources"] == budget.sources_state()
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def _read_kind(manifest_path: Path, kind: str) -> dict[int, pd.DataFrame]:
+    table = pq.read_table(
+        manifest_path.parent / f"kind={kind}", memory_map=True, partitioning="hive"
+    )
+    df = table.to_pandas()
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return {
+        int(year): part.drop(columns="year").reset_index(drop=True)
+        for year, part in df.groupby("year", sort=True, observed=True)
+    }
+
+
+def parts(kind: str) -> dict[int, Path]:
+    """Parquet file of every year of dataset kind, in ascending year order"""
+    return {
+        int(path.parent.name[5:]): path
+        for path in sorted((SNAPSHOT_PATH / f"kind={kind}").glob("year=*/part-0.parquet"))
+    }
+
+
+def read_part(path: Path, renames: tuple[tuple[str, str], ...] = ()) -> pd.DataFrame:
+    """Frame of one year partition with labels as plain strings"""
+    df = pq.read_table(path, memory_map=True).to_pandas()
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return df.rename(columns=dict(renames))
+
+
+def read_kind(kind: str) -> dict[int, pd.DataFrame]:
+    """Frames of dataset kind keyed by budget year"""
+    return budget.cached(MANIFEST_PATH, _read_kind, kind)
+
+
+def _read_summary(manifest_path: Path) -> dict[str, pd.DataFrame]:
+    summary = {}
+    for name, df in pd.concat(
+        [part.assign(year=str(year)) for year, part in read_kind("summary").items()]
+    ).groupby("Tabela", sort=False):
+        order = list(df["Nazwa"].unique())
+        wide = df.pivot(index="Nazwa", columns="year", values="Kwota").reindex(order)
+        wide.columns.name = None
+        summary[name] = wide.reset_index()
+    return summary
+
+
+def read_summary() -> dict[str, pd.DataFrame]:
+    """Wide summary tables rebuilt from the snapshot"""
+    return budget.cached(MANIFEST_PATH, _read_summary)
+
+
+if __name__ == "__main__":
+    try:
+        build()
+    except stream.SchemaError as error:
+        sys.exit(f"Snapshot not written, the app reads the CSV files\n{error}")
+    print(f"Snapshot written to {SNAPSHOT_PATH}")
@@ -0,0 +1,159 @@
+"""Chunked CSV reader of the budget tables with an explicit schema
+
+Files are read in chunks of ``CHUNK_ROWS`` rows with every column as text, so
+nothing depends on dtype inference. Label columns get quotes and line breaks
+cleaned in one pass, amount columns accept Polish decimals (``1 234,56`` or
+``1.234,56``). Values that do not fit the schema are reported as row errors:
+``read`` raises them or drops the rows with a warning, ``to_parquet`` writes
+the valid rows chunk by chunk, so files larger than memory can be stored.
+"""
+
+import warnings
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CHUNK_ROWS: int = 100_000
+MAX_REPORTED: int = 20
+
+# quotes and line breaks of the spreadsheet cells are dropped
+_CLEAN = str.maketrans("", "", "'\"\r\n")
+_DIRTY = r"['\"\r\n]"
+
+
+class Column(NamedTuple):
+    name: str
+    amount: bool = False
+    # rows without the value are skipped (e.g. subtotal rows of a unit)
+    skip_missing: bool = False
+    required: bool = False
+
+
+class RowError(NamedTuple):
+    row: int
+    column: str
+    value: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"row {self.row}, {self.column}={self.value!r}: {self.message}"
+
+
+class SchemaError(ValueError):
+    def __init__(self, path: Path, errors: list[RowError]) -> None:
+        self.errors = errors
+        shown = "\n  ".join(str(error) for error in errors[:MAX_REPORTED])
+        more = f"\n  ... {len(errors) - MAX_REPORTED} more" if len(errors) > MAX_REPORTED else ""
+        super().__init__(f"{path}: {len(errors)} invalid values\n  {shown}{more}")
+
+
+CURRENT_EXPENSES: tuple[Column, ...] = (
+    Column("Jednostka", required=True),
+    Column("Nazwa zadania", skip_missing=True),
+    Column("Akronim"),
+    Column("Wydatki rzeczowe", amount=True),
+    Column("Wydatki na utrzymanie stanowiska pracy", amount=True),
+    Column("Wydatki na zadania ogółem", amount=True),
+)
+
+
+def amounts(values: pd.Series) -> pd.Series:
+    """Float amounts of text values, with Polish decimal comma and separators"""
+    parsed = pd.to_numeric(values, errors="coerce").astype(np.float64)
+    other = values.notna() & parsed.isna()
+    if not other.any():
+        return parsed
+    # only values which are not plain numbers take the slower Polish format path
+    text = values[other].str.replace(r"\s", "", regex=True)
+    comma = text.str.contains(",", regex=False)
+    text = text.where(~comma, text.str.replace(".", "", regex=False).str.replace(",", "."))
+    return parsed.mask(other, pd.to_numeric(text, errors="coerce"))
+
+
+def _cleaned(values: pd.Series) -> pd.Series:
+    """Labels without quotes and line breaks, only affected values are rewritten"""
+    dirty = values.str.contains(_DIRTY, regex=True, na=False)
+    if not dirty.any():
+        return values
+    return values.mask(dirty, values[dirty].str.translate(_CLEAN))
+
+
+def _typed(
+    chunk: pd.DataFrame, schema: tuple[Column, ...], first_row: int
+) -> tuple[pd.DataFrame, list[RowError]]:
+    """Chunk converted to the schema dtypes and errors of its invalid values"""
+    skipped = np.zeros(len(chunk), dtype=bool)
+    invalid = np.zeros(len(chunk), dtype=bool)
+    errors: list[RowError] = []
+    columns = {}
+    for column in schema:
+        raw = chunk[column.name]
+        if column.skip_missing:
+            skipped = skipped | raw.isna().to_numpy()
+        if column.amount:
+            values = amounts(raw)
+            bad = (raw.notna() & values.isna()).to_numpy()
+            message = "not a number"
+        else:
+            values = _cleaned(raw)
+            bad = raw.isna().to_numpy() if column.required else np.zeros(len(chunk), dtype=bool)
+            message = "missing value"
+        bad = bad & ~skipped
+        invalid = invalid | bad
+        errors.extend(
+            RowError(first_row + int(pos), column.name, str(raw.iloc[pos]), message)
+            for pos in np.flatnonzero(bad)
+        )
+        columns[column.name] = values
+    keep = ~(skipped | invalid)
+    return pd.DataFrame(columns, index=chunk.index)[keep].reset_index(drop=True), errors
+
+
+def read_chunks(
+    path: Path, schema: tuple[Column, ...], chunk_rows: int = CHUNK_ROWS
+) -> Iterator[tuple[pd.DataFrame, list[RowError]]]:
+    """Valid rows and row errors of every chunk of the CSV file"""
+    names = [column.name for column in schema]
+    reader = pd.read_csv(path, usecols=names, dtype=str, chunksize=chunk_rows)
+    first_row = 1
+    for chunk in reader:
+        yield _typed(chunk[names], schema, first_row)
+        first_row += len(chunk)
+
+
+def read(path: Path, schema: tuple[Column, ...], strict: bool = True) -> pd.DataFrame:
+    """Whole file as one frame, invalid rows raise SchemaError or are dropped with a warning"""
+    frames, errors = [], []
+    for chunk, chunk_errors in read_chunks(path, schema):
+        frames.append(chunk)
+        errors.extend(chunk_errors)
+    if errors:
+        if strict:
+            raise SchemaError(path, errors)
+        warnings.warn(str(SchemaError(path, errors)), stacklevel=2)
+    if not frames:
+        return pd.DataFrame(columns=[column.name for column in schema])
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_parquet(
+    path: Path, schema: tuple[Column, ...], target: Path, arrow_schema: Optional[pa.Schema] = None
+) -> list[RowError]:
+    """Stream valid rows of the CSV file into a Parquet file, one row group per chunk"""
+    errors: list[RowError] = []
+    writer = None
+    try:
+        for chunk, chunk_errors in read_chunks(path, schema):
+            errors.extend(chunk_errors)
+            table = pa.Table.from_pandas(chunk, schema=arrow_schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(target, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return errors
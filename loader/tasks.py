@@ -0,0 +1,131 @@
+"""Identity of current expenses tasks across budget years
+
+Task names change slightly between budgets (trailing spaces, typos, reworded
+titles), so joining years on the exact ``Nazwa zadania`` loses renamed tasks.
+Tasks are linked year by year within their unit (Jednostka): by equal
+normalized name, then by a shared ``Akronim``, then by the most similar name
+scoring at least ``SIMILARITY``. Blocking by unit keeps matching near-linear.
+The mapping (Rok, Jednostka, Nazwa zadania) → (ID, Zadanie) with the newest
+name of every task is written to ``data/budget/zadania.csv`` by the ingest or
+by ``python -m loader.tasks``.
+"""
+
+import argparse
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from loader import budget
+
+TASKS_PATH: Path = budget.DATA_PATH / "zadania.csv"
+SIMILARITY: float = 0.85
+KEYS: list[str] = ["Rok", "Jednostka", "Nazwa zadania"]
+COLUMNS: list[str] = [*KEYS, "ID", "Zadanie"]
+# lowercased values of the Akronim column that do not identify a task
+MISSING_ACRONYMS: set[str] = {"", "0", "nan"}
+
+
+def normalize(name: str) -> str:
+    """Lowercase name with punctuation dropped and whitespace collapsed"""
+    return " ".join(re.sub(r"[^\w]+", " ", str(name).lower()).split())
+
+
+def _similarity(a: str, b: str) -> float:
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.ratio() if matcher.real_quick_ratio() >= SIMILARITY else 0.0
+
+
+def _match_unit(years: list[tuple[str, pd.DataFrame]], next_id: int) -> tuple[list[tuple], int]:
+    """Mapping rows of one unit, tasks of every year linked to earlier ones"""
+    known: dict[int, tuple[str, str]] = {}  # id -> (normalized name, acronym) last seen
+    rows = []
+    for year, df in years:
+        tasks: dict[str, tuple[list[str], str]] = {}
+        for name, acronym in zip(df["Nazwa zadania"], df["Akronim"]):
+            tasks.setdefault(normalize(name), ([], str(acronym).strip()))[0].append(name)
+        free = dict(known)
+        assigned: dict[str, int] = {}
+
+        def link(norm: str, task_id: int) -> None:
+            assigned[norm] = task_id
+            del free[task_id]
+
+        by_name = {known_norm: task_id for task_id, (known_norm, _) in free.items()}
+        for norm in tasks:
+            if norm in by_name:
+                link(norm, by_name[norm])
+        acronyms = Counter(acronym for _, acronym in tasks.values())
+        for norm, (_, acronym) in tasks.items():
+            if norm in assigned or acronym.lower() in MISSING_ACRONYMS or acronyms[acronym] > 1:
+                continue
+            candidates = [task_id for task_id, (_, a) in free.items() if a == acronym]
+            if len(candidates) == 1:
+                link(norm, candidates[0])
+        pairs = sorted(
+            (
+                (_similarity(norm, known_norm), norm, task_id)
+                for norm in tasks
+                if norm not in assigned
+                for task_id, (known_norm, _) in free.items()
+            ),
+            reverse=True,
+        )
+        for score, norm, task_id in pairs:
+            if score >= SIMILARITY and norm not in assigned and task_id in free:
+                link(norm, task_id)
+        for norm, (names, acronym) in tasks.items():
+            if norm not in assigned:
+                assigned[norm] = next_id
+                next_id += 1
+            known[assigned[norm]] = (norm, acronym)
+            rows.extend((year, name, assigned[norm]) for name in names)
+    return rows, next_id
+
+
+def match(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Task ID and newest name of every (Rok, Jednostka, Nazwa zadania) of frames"""
+    years = sorted(frames, key=lambda label: label[-4:])
+    by_unit: dict[str, list[tuple[str, pd.DataFrame]]] = {}
+    for year in years:
+        for unit, df in frames[year].groupby("Jednostka", sort=True):
+            by_unit.setdefault(unit, []).append((year[-4:], df))
+    rows, next_id = [], 0
+    for unit, unit_years in by_unit.items():
+        unit_rows, next_id = _match_unit(unit_years, next_id)
+        rows.extend((year, unit, name, task_id) for year, name, task_id in unit_rows)
+    mapping = pd.DataFrame(rows, columns=KEYS + ["ID"]).drop_duplicates(KEYS)
+    newest = mapping.sort_values("Rok").groupby("ID")["Nazwa zadania"].last().str.strip()
+    return mapping.assign(Zadanie=newest.reindex(mapping["ID"]).to_numpy())[COLUMNS]
+
+
+def _read(path: Path) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={"Rok": str})
+
+
+def stored() -> Optional[pd.DataFrame]:
+    """Mapping written at ingestion time, None when it was not built yet"""
+    return budget.cached(TASKS_PATH, _read) if TASKS_PATH.exists() else None
+
+
+def write() -> Path:
+    """Match tasks of all current expenses CSV files and store the mapping"""
+    mapping = match(budget.load_current_expenses(use_snapshot=False))
+    mapping.to_csv(TASKS_PATH, index=False)
+    budget.invalidate(TASKS_PATH)
+    return TASKS_PATH
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args(args)
+    path = write()
+    mapping = stored()
+    renamed = mapping.groupby("ID")["Nazwa zadania"].nunique().gt(1).sum()
+    print(f"{mapping['ID'].nunique()} tasks, {renamed} renamed, written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Background hot-reload of the budget CSV files
+
+``start()`` watches ``data/budget`` with watchdog. A changed file is reparsed
+alone, the long fact tables and the cube are patched from the cached frames
+and the versions of the changed datasets are bumped, so only results derived
+from them get recomputed. A failed reload is logged and its files are
+reloaded again with the next change. Run ``python -m loader.watch`` to follow
+the reloads in a terminal.
+"""
+
+import argparse
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from loader import budget, plane, tasks
+
+# editors and the ingest write a file in several steps, changes are batched
+DEBOUNCE_SECONDS: float = 0.5
+IGNORED: frozenset[str] = frozenset({"snapshot", ".ingest"})
+EVENTS: frozenset[str] = frozenset({"created", "modified", "moved", "deleted"})
+
+Listener = Callable[[int, list[Path]], None]
+
+_observer: Optional[Observer] = None
+_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+def _dataset(path: Path) -> Optional[str]:
+    """Cube dataset the file belongs to, None for the summary files"""
+    if path == tasks.TASKS_PATH:
+        return "wydatki_biezace"
+    parent = path.parent.name
+    return parent if parent in budget.DATASETS else None
+
+
+def refresh(paths: list[Path]) -> int:
+    """Reparse changed files, patch their fact tables and bump their datasets version"""
+    for path in paths:
+        if not path.exists():
+            budget.invalidate(path)
+    loaders = {
+        "wydatki_biezace": budget.load_current_expenses,
+        "districts": budget.load_districts,
+        "doch_wyd": budget.load_incomes_expenses,
+        None: budget.load_summary,
+    }
+    from loader import cube  # pages without cube data do not import it at startup
+
+    datasets = {_dataset(path) for path in paths}
+    if plane.is_worker():
+        # cube datasets are republished by the data plane, its switch bumps them
+        datasets = {dataset for dataset in datasets if dataset is None}
+    for dataset in datasets:
+        loaders[dataset]()
+        if dataset:
+            cube.build(dataset)
+    return budget.bump(datasets)
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, listener: Optional[Listener]) -> None:
+        self.listener = listener
+        self.pending: set[Path] = set()
+        self.timer: Optional[threading.Timer] = None
+        self.lock = threading.Lock()
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type not in EVENTS:
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        changed = [
+            Path(path)
+            for path in paths
+            if path.endswith(".csv")
+            and not IGNORED.intersection(Path(path).relative_to(budget.DATA_PATH).parts)
+        ]
+        if not changed:
+            return
+        with self.lock:
+            self.pending.update(changed)
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(DEBOUNCE_SECONDS, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self) -> None:
+        with self.lock:
+            paths, self.pending = sorted(self.pending), set()
+        try:
+            version = refresh(paths)
+            if self.listener:
+                self.listener(version, paths)
+        except Exception:  # e.g. a file still being written, the watcher thread must survive
+            _log.exception("Reload of %s failed, retried with the next change", paths)
+            with self.lock:
+                self.pending.update(paths)
+
+
+def start(listener: Optional[Listener] = None) -> Observer:
+    """Start the process wide watcher of the data tree once, later calls reuse it"""
+    global _observer
+    with _lock:
+        if _observer is None or not _observer.is_alive():
+            _observer = Observer()
+            _observer.daemon = True
+            _observer.schedule(_Handler(listener), str(budget.DATA_PATH), recursive=True)
+            _observer.start()
+        return _observer
+
+
+def stop() -> None:
+    global _observer
+    with _lock:
+        if _observer is not None:
+            _observer.stop()
+            _observer.join()
+            _observer = None
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    argparse.ArgumentParser(description="Reload budget CSV files on change").parse_args(args)
+
+    def report(version: int, paths: list[Path]) -> None:
+        names = ", ".join(str(path.relative_to(budget.DATA_PATH)) for path in paths)
+        print(f"Data version {version}: reloaded {names}")
+
+    start(report)
+    print(f"Watching {budget.DATA_PATH}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
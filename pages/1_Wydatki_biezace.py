@@ -1,26 +1,11 @@
 """App sub page with current expanses dash"""
 
-import os
-from pathlib import Path
-from math import log, floor
-
-import pandas as pd
 import streamlit as st
 from streamlit_echarts import st_echarts
 
 from charts import bar, line
-from charts.model import df_to_series
-
-
-def human_format(number) -> str:
-    units = ["", " TYS", " MIL", " MLD", " TRL"]
-    k = 1000.0
-    prefix = "+"
-    if number < 0:
-        number *= -1
-        prefix = "-"
-    magnitude = int(floor(log(number, k)))
-    return f"{prefix}%.2f%s" % (number / k**magnitude, units[magnitude])
+from engine import current_expenses, search
+from loader import watch
 
 
 st.set_page_config(
@@ -29,111 +14,58 @@ st.set_page_config(
     initial_sidebar_state="expanded",
     layout="wide",
 )
+watch.start()
 
-_f_path = Path(__file__).resolve().parents[1]  # app catalog path
-data_path = f"{_f_path}/data/budget/wydatki_biezace"
-dfs: dict[str, pd.DataFrame] = {}
-for file in sorted(os.listdir(data_path)):
-    if file.endswith(".csv"):
-        df = pd.read_csv(f"{data_path}/{file}")
-        df = df[~df["Nazwa zadania"].isna()]
-        for char in ["'", '"', "\n"]:
-            df.replace(char, "", inplace=True)
-        dfs[file[11:21]] = df
-
-units_filter_list = sorted(list(dfs[list(dfs.keys())[0]]["Jednostka"].unique()))
 with st.sidebar:
     st.image("https://www.bip.krakow.pl/zalaczniki/dokumenty/n/388864")
     st.markdown("### Filtry dla całego panelu:")
     year_filter = st.multiselect(
-        label="Lata", placeholder="Wybierz lata", options=list(dfs.keys())
+        label="Lata", placeholder="Wybierz lata", options=current_expenses.years()
     )
     unit_filter = st.multiselect(
-        label="Jednostka", placeholder="Wybierz jednostkę", options=units_filter_list
+        label="Jednostka",
+        placeholder="Wybierz jednostkę",
+        options=current_expenses.units(),
     )
 
-
-if year_filter:
-    for key in list(dfs.keys()):
-        if key not in year_filter:
-            del dfs[key]
-if unit_filter:
-    units_filter_list = unit_filter
-    for key, item in dfs.items():
-        dfs[key] = dfs[key][dfs[key]["Jednostka"].isin(unit_filter)]
-
-totals = {key: item["Wydatki na zadania ogółem"].sum() for key, item in dfs.items()}
-unit_totals = {}
-for key, item in dfs.items():
-    unit_totals[key] = (
-        item[["Jednostka", "Wydatki na zadania ogółem"]]
-        .groupby(by="Jednostka", as_index=False)
-        .agg("sum")
-    )
-
-df_unit_totals = pd.DataFrame(columns=["Jednostka", "Wydatki na zadania ogółem"])
-for key, item in dfs.items():
-    next_df = (
-        item[["Jednostka", "Wydatki na zadania ogółem"]]
-        .groupby(by="Jednostka", as_index=False)
-        .agg("sum")
-    )
-    df_unit_totals = df_unit_totals.merge(
-        next_df, on="Jednostka", how="outer", suffixes=["", f"_{key}"]
-    )
-df_unit_totals.drop(columns=["Wydatki na zadania ogółem"], inplace=True)
-df_unit_totals.fillna(0, inplace=True)
+spec = current_expenses.CurrentExpensesFilter(
+    years=tuple(year_filter), units=tuple(unit_filter)
+)
 
 with st.container():
     st.header("Planowany budżet na wydatki bieżące Krakowa:")
     st.divider()
+    with st.container():
+        search_query = st.text_input(
+            label="Wyszukiwarka",
+            placeholder="Szukaj zadania, akronimu, jednostki, pozycji dzielnic lub dochodów",
+        )
+        search_hits = {
+            " · ".join(filter(None, (hit.kind, hit.name, hit.context))): hit
+            for hit in search.search(search_query)
+        }
+        if search_query and not search_hits:
+            st.info("Brak wyników")
+        if search_hits:
+            search_hit = search_hits[
+                st.selectbox(label="Wyniki", options=list(search_hits), index=0)
+            ]
+            st_echarts(
+                options=line.get_totals_chart_opt(**search.series_chart(search_hit)._asdict())
+            )
     with st.container():
         st.markdown(
             "#### Wykres sumy wdatków biezących na wszystkie jednostki budżetowe"
         )
-        data = []
-        mark_points_data = []
-        prev_val = None
-        for idx, val in enumerate(totals.values()):
-            data.append(val)
-            if prev_val:
-                diff = float(val - prev_val)
-                color = "#a53860" if diff > 0 else "#014f86"
-                symbol_rotate = 0 if diff > 0 else -180
-                mark_points_data.append(
-                    {
-                        "name": f"P{idx}",
-                        "value": human_format(diff),
-                        "xAxis": idx,
-                        "yAxis": val,
-                        "symbol": "triangle",
-                        "itemStyle": {"color": color},
-                        "symbolRotate": symbol_rotate,
-                        "symbolSize": 20,
-                        "symbolOffset": [0, "150%"],
-                    }
-                )
-            prev_val = val
-        totals_series = [
-            {
-                "name": "Suma",
-                "data": data,
-                "type": "line",
-                "lineStyle": {"color": "#f77f00"},
-                "itemStyle": {"color": "#f77f00"},
-                "smooth": True,
-                "label": {"show": True, "position": "top"},
-                "markPoint": {"data": mark_points_data},
-            }
-        ]
         st_echarts(
             options=line.get_totals_chart_opt(
-                title="Suma wydatków na zadania bieżące ogółem",
-                x=list(dfs.keys()),
-                series=totals_series,
-                y_label="PLN",
+                **current_expenses.totals_chart(spec)._asdict()
             )
         )
+        with st.expander("Zmiany rok do roku jednostek"):
+            st.dataframe(
+                current_expenses.unit_changes(spec), use_container_width=True, hide_index=True
+            )
     with st.container():
         st.markdown("### Wykres liniowy wydatków na jednostki budżetowe")
         unit_totals_plot_col, unit_totals_ctrl_col = st.columns([5,1])
@@ -148,17 +80,14 @@ with st.container():
                 label="Top n wartości" , min_value=1, max_value=25, value=10, step=1
             )
         with unit_totals_plot_col:
-            sub_totals_sort = False if utpc_radio_sort == "Malejąco" else True
-            df_units_sorted = df_unit_totals.sort_values(
-                by="Jednostka", ascending=sub_totals_sort).head(top_n_lines_units)
             st_echarts(
                 height="600px",
                 options=line.get_line_units_opt(
-                    title=f"Top {top_n_lines_units} alfabetycznie jednostek i ich budżet na bieżące zadana",
-                    x=list(dfs.keys()),
-                    y_label="PLN",
-                    series=df_to_series(df_units_sorted),
-                    legend=list(df_units_sorted["Jednostka"]),
+                    **current_expenses.units_chart(
+                        spec,
+                        ascending=utpc_radio_sort != "Malejąco",
+                        top_n=top_n_lines_units,
+                    )._asdict()
                 ),
             )
     with st.container():
@@ -178,22 +107,13 @@ with st.container():
             )
 
         with unit_bar_chart_col:
-            newest_values: str = df_unit_totals.columns[-1]
-            sub_df_sort = False if ubcc_radio_sort == "Malejąco" else True
-            sub_df = df_unit_totals[["Jednostka", newest_values]].sort_values(
-                by=newest_values, ascending=sub_df_sort
-            )
-            sub_df = sub_df[sub_df[newest_values] > 0]
-            if top_n_bar_units:
-                sub_df = sub_df.head(top_n_bar_units)
             show_bar_fn = bar.get_bar_by_types_opt if top_n_bar_units else bar.get_bar_by_units_opt
             st_echarts(
                 height="500px",
                 options=show_bar_fn(
-                    title=newest_values,
-                    x=list(sub_df["Jednostka"]),
-                    y_label="PLN",
-                    series=[{"data": list(sub_df[newest_values]), "name": "Jednostka"}],
+                    **current_expenses.units_bar_chart(
+                        spec, ascending=ubcc_radio_sort != "Malejąco", top_n=top_n_bar_units
+                    )._asdict()
                 )
             )
     with st.container():
@@ -205,32 +125,24 @@ with st.container():
             st.markdown("#### Filtr wykresu zadań")
             subunit_selection = st.selectbox(
                 label="Jednostka budżetowa",
-                options=units_filter_list,
+                options=current_expenses.units(spec),
                 index=0,
                 placeholder="Wybierz jednostkę",
             )
-        df_subunits = pd.DataFrame(
-            columns=("Nazwa zadania", "Wydatki na zadania ogółem")
-        )
-        for key, item in dfs.items():
-            next_df = item[item["Jednostka"] == subunit_selection]
-            df_subunits = df_subunits.merge(
-                next_df[["Nazwa zadania", "Wydatki na zadania ogółem"]],
-                on="Nazwa zadania",
-                how="outer",
-                suffixes=["", f"_{key}"],
+            top_n_subunits = st.slider(
+                label="Maks. liczba zadań", min_value=1, max_value=50, value=20, step=1
+            )
+            subunits_rank = st.radio(
+                label="Wybór zadań wg",
+                options=["Najnowsza kwota", "Zmienność"],
+                index=0,
             )
-        df_subunits.drop(columns=["Wydatki na zadania ogółem"], inplace=True)
-        df_subunits.fillna(0, inplace=True)
-        df_subunits = df_subunits[(df_subunits[list(df_subunits.columns)[1:]] > 0).all(axis=1)]
         with chart_subunits_col:
             st_echarts(
                 height="700px",
                 options=line.get_subunits_opt(
-                    title=f"Zadania jed.: {subunit_selection}",
-                    x=list(dfs.keys()),
-                    y_label="PLN",
-                    series=df_to_series(df_subunits),
-                    legend=[str(n)[:50] for n in list(df_subunits["Nazwa zadania"])],
+                    **current_expenses.tasks_chart(spec, subunit_selection)._asdict(),
+                    top_k=top_n_subunits,
+                    rank_by="latest" if subunits_rank == "Najnowsza kwota" else "variance",
                 ),
             )
@@ -0,0 +1,50 @@
+"""API endpoints take YYYY years for every dataset"""
+
+import asyncio
+import json
+
+import pytest
+import tornado.httpclient
+import tornado.httpserver
+import tornado.testing
+
+from api import server
+
+# one endpoint of every dataset with its column of the 2024 amounts
+ENDPOINTS = {
+    "current-expenses/units": "01_01_2024",
+    "districts/types": "01.01.2024",
+    "incomes-expenses/dochody": "Ogółem2024",
+    "summary/dochody": "2024",
+}
+
+
+def _get(path: str) -> tornado.httpclient.HTTPResponse:
+    async def fetch() -> tornado.httpclient.HTTPResponse:
+        sock, port = tornado.testing.bind_unused_port()
+        http_server = tornado.httpserver.HTTPServer(server.make_app())
+        http_server.add_sockets([sock])
+        try:
+            return await tornado.httpclient.AsyncHTTPClient().fetch(
+                f"http://127.0.0.1:{port}/api/{path}", raise_error=False
+            )
+        finally:
+            http_server.stop()
+
+    return asyncio.run(fetch())
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_year_selects_dataset_label(endpoint):
+    response = _get(f"{endpoint}?year=2024")
+    assert response.code == 200
+    records = json.loads(response.body)
+    label = ENDPOINTS[endpoint]
+    assert records and all(label in record for record in records)
+    assert any(record[label] for record in records)
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+@pytest.mark.parametrize("year", ["1999", "01_01_2024", "24"])
+def test_unknown_year_is_rejected(endpoint, year):
+    assert _get(f"{endpoint}?year={year}").code == 400
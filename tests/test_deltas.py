@@ -0,0 +1,43 @@
+"""Year over year changes and CAGR of engine.deltas"""
+
+import numpy as np
+import pytest
+
+from engine import deltas
+
+nan = np.nan
+
+CASES = [
+    # values, years, change, pct_change, cagr
+    ([100, 110, 121], None, [nan, 10, 11], [nan, 10, 10], 10),
+    ([100, 121], [2021, 2023], [nan, 21], [nan, 21], 10),
+    # a change from 0 is real, its percentage is undefined
+    ([0, 10, 20], None, [nan, 10, 10], [nan, nan, 100], nan),
+    ([-5, 5, 10], None, [nan, 10, 5], [nan, 200, 100], nan),
+    ([5, 5, 0], None, [nan, 0, -5], [nan, 0, -100], nan),
+    # CAGR spans the first and the last year only
+    ([10, nan, 20], None, [nan, nan, nan], [nan, nan, nan], (2 ** 0.5 - 1) * 100),
+    ([100], None, [nan], [nan], nan),
+    ([100, 200], [2024, 2024], [nan, 100], [nan, 100], nan),
+]
+
+
+@pytest.mark.parametrize("values, years, change, pct_change, cagr", CASES)
+def test_deltas(values, years, change, pct_change, cagr):
+    result = deltas.deltas(np.array([values]), None if years is None else np.array(years))
+    np.testing.assert_allclose(result.change, [change])
+    np.testing.assert_allclose(result.pct_change, [pct_change])
+    np.testing.assert_allclose(result.cagr, [cagr])
+
+
+def test_deltas_of_all_series_at_once():
+    values = np.array([case[0] for case in CASES if len(case[0]) == 3])
+    result = deltas.deltas(values)
+    np.testing.assert_allclose(result.cagr, [10, nan, nan, nan, (2 ** 0.5 - 1) * 100])
+
+
+def test_frame_rounds_percentages():
+    df = deltas.frame(["A"], ["01.01.2021", "01.01.2022"], np.array([[3.0, 4.0]]))
+    assert df.columns.tolist() == deltas.COLUMNS
+    assert df["Zmiana %"].tolist()[1] == 33.33
+    assert df["CAGR %"].tolist() == [33.33, 33.33]
@@ -0,0 +1,11 @@
+"""Cached engine results do not depend on the order of selected options"""
+
+from engine import cache, current_expenses
+
+
+def test_units_ignore_selection_order():
+    cache.clear()
+    first, second = current_expenses.units()[:2]
+    spec = current_expenses.CurrentExpensesFilter
+    assert current_expenses.units(spec(units=(second, first))) == sorted([first, second])
+    assert current_expenses.units(spec(units=(first, second))) == sorted([first, second])
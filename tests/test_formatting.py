@@ -0,0 +1,35 @@
+"""Amount labels of charts.formatting"""
+
+import math
+
+import pytest
+
+from charts.formatting import human_format, human_formats
+
+LABELS = [
+    (0, "0"),
+    (-0.0, "0"),
+    (math.nan, ""),
+    (math.inf, ""),
+    (-math.inf, ""),
+    # halves are rounded up, away from zero for negative amounts
+    (2.5, "+2.50"),
+    (0.005, "+0.01"),
+    (1005, "+1.01 TYS"),
+    (-1005, "-1.01 TYS"),
+    (1234.5, "+1.23 TYS"),
+    (-450e3, "-450.00 TYS"),
+    (1.5e6, "+1.50 MIL"),
+    (2.345e9, "+2.35 MLD"),
+    (1e15, "+1000.00 TRL"),
+]
+
+
+@pytest.mark.parametrize("value, label", LABELS)
+def test_human_format(value, label):
+    assert human_format(value) == label
+
+
+def test_human_formats_label_every_value_in_order():
+    values, labels = zip(*LABELS)
+    assert human_formats([*values, *values]) == [*labels, *labels]
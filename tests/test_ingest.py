@@ -0,0 +1,76 @@
+"""Parsers of the XLSX attachments reproduce the canonical CSV tables"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pytest
+
+from loader import ingest
+
+
+@lru_cache(maxsize=None)
+def _parsed(path: Path) -> tuple[ingest.ParsedTable, ...]:
+    return tuple(ingest._parse(path))
+
+
+def _difference(kind: str, year: int, df: pd.DataFrame) -> Optional[str]:
+    """First difference of labels or amounts between the parsed and the canonical table"""
+    canonical = pd.read_csv(ingest.CANONICAL_FILES[kind](year))
+    try:
+        # amounts integral in every row are read back as integers
+        pd.testing.assert_frame_equal(ingest._as_written(df), canonical, check_dtype=False)
+    except AssertionError as error:
+        return str(error)
+    return None
+
+
+@pytest.mark.parametrize("stem", ingest.PARSERS)
+def test_parser_matches_canonical_tables(stem):
+    paths = [path for path in ingest.workbooks() if path.stem == stem]
+    if not paths:
+        pytest.skip(f"no {stem} workbooks")
+    compared: dict[tuple[str, int], list[Optional[str]]] = {}
+    for path in paths:
+        try:
+            tables = _parsed(path)
+        except ValueError:
+            continue  # skipped and reported by the ingest
+        for kind, year, df in tables:
+            if ingest.CANONICAL_FILES[kind](year).exists():
+                compared.setdefault((kind, year), []).append(_difference(kind, year, df))
+    assert compared
+    # a year is in the attachments of two budgets, the canonical table is one of them
+    for key, differences in compared.items():
+        assert None in differences, (key, differences)
+
+
+@pytest.mark.parametrize(
+    "path", ingest.workbooks(), ids=lambda path: f"{path.parent.name}/{path.name}"
+)
+def test_workbook_yields_rows_or_fails(path):
+    try:
+        tables = _parsed(path)
+    except ValueError as error:
+        assert str(error)
+        return
+    assert any(not table.df.empty for table in tables)
+
+
+def test_overwrite_keeps_tables_with_other_rows(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "Dochody_2024.csv"
+    monkeypatch.setitem(ingest.CANONICAL_FILES, "dochody", lambda year: path)
+    monkeypatch.setattr(ingest.budget, "DATA_PATH", tmp_path)
+    table = pd.DataFrame(
+        {"Nazwa": ["Oświata", "Rodzina"], "Ogółem": [3.0, 2.0], "Gmina": [2.0, 1.0],
+         "Powiat": [1.0, 1.0]}
+    )
+    assert ingest.write({("dochody", 2024): table}) == [path]
+    updated = table.assign(Ogółem=[4.0, 2.0])
+    assert ingest.write({("dochody", 2024): updated}, overwrite=True) == [path]
+    assert pd.read_csv(path)["Ogółem"].tolist() == [4.0, 2.0]
+    other = pd.concat([updated, updated.head(1).assign(Nazwa="Kultura")], ignore_index=True)
+    assert ingest.write({("dochody", 2024): other}, overwrite=True) == []
+    assert pd.read_csv(path)["Nazwa"].tolist() == ["Oświata", "Rodzina"]
+    assert "Kept Dochody_2024.csv" in capsys.readouterr().err